@@ -0,0 +1,141 @@
+import re
+import json
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit, parse_qs
+
+CONDITIONS = [
+    ("Clear", "clear sky"), ("Clouds", "scattered clouds"), ("Clouds", "broken clouds"),
+    ("Rain", "light rain"), ("Clouds", "few clouds")
+]
+USER_PROMPT_RE = re.compile(r'User: "(.*)"\s*$', re.DOTALL)
+CITY_RE = re.compile(r"\b(?:in|at|for)\s+([A-Z][a-zA-Z]+(?:\s[A-Z][a-zA-Z]+)*)")
+DATE_RE = re.compile(r"\b(today|tomorrow|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", re.IGNORECASE)
+
+# Local stand-in for OpenWeather /data/2.5/forecast and Together /v1/chat/completions
+class FakeUpstream:
+    def __init__(self, latency_ms=50, jitter_ms=10, rate_429=0.0, token_delay_ms=5, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.token_delay_ms = token_delay_ms
+        self.random = random.Random(seed)
+        self.server = None
+        self.connections = set()
+        self.requests = {"forecast": 0, "chat": 0, "rate_limited": 0}
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            for writer in list(self.connections):
+                writer.close()
+            await self.server.wait_closed()
+
+    async def delay(self):
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(self.latency_ms + jitter, 0) / 1000)
+
+    async def handle(self, reader, writer):
+        # HTTP/1.1 with keep-alive, enough for httpx's connection pool
+        self.connections.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self.route(method, target, body, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancelled at shutdown while idle on a keep-alive connection
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def route(self, method, target, body, writer):
+        await self.delay()
+        if self.rate_429 and self.random.random() < self.rate_429:
+            self.requests["rate_limited"] += 1
+            await self.respond(writer, 429, {"error": "rate limited"}, {"Retry-After": "1"})
+            return
+
+        url = urlsplit(target)
+        if method == "GET" and url.path == "/data/2.5/forecast":
+            self.requests["forecast"] += 1
+            query = parse_qs(url.query)
+            city = query["q"][0] if "q" in query else ",".join(query.get("lat", []) + query.get("lon", [])) or "London"
+            await self.respond(writer, 200, self.forecast(city))
+        elif method == "POST" and url.path == "/v1/chat/completions":
+            self.requests["chat"] += 1
+            payload = json.loads(body or b"{}")
+            content = self.completion(payload["messages"][-1]["content"])
+            if payload.get("stream"):
+                await self.stream(writer, content)
+            else:
+                await self.respond(writer, 200, {"choices": [{"message": {"role": "assistant", "content": content}}]})
+        else:
+            await self.respond(writer, 404, {"error": "not found"})
+
+    async def respond(self, writer, status, payload, extra_headers=None):
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(body)), **(extra_headers or {})}
+        writer.write(self.head(status, headers) + body)
+        await writer.drain()
+
+    async def stream(self, writer, content):
+        writer.write(self.head(200, {"Content-Type": "text/event-stream", "Transfer-Encoding": "chunked"}))
+        for token in re.findall(r"\S+\s*", content):
+            event = "data: " + json.dumps({"choices": [{"delta": {"content": token}}]}) + "\n\n"
+            writer.write(self.chunk(event.encode()))
+            await writer.drain()
+            await asyncio.sleep(self.token_delay_ms / 1000)
+        writer.write(self.chunk(b"data: [DONE]\n\n") + b"0\r\n\r\n")
+        await writer.drain()
+
+    def head(self, status, headers):
+        reason = {200: "OK", 404: "Not Found", 429: "Too Many Requests"}.get(status, "OK")
+        lines = [f"HTTP/1.1 {status} {reason}"] + [f"{k}: {v}" for k, v in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    def chunk(self, data):
+        return f"{len(data):X}\r\n".encode() + data + b"\r\n"
+
+    def forecast(self, city):
+        start = int(time.time()) // 10800 * 10800
+        entries = []
+        for i in range(40):
+            main, description = CONDITIONS[(i + len(city)) % len(CONDITIONS)]
+            entries.append({
+                "dt": start + i * 10800,
+                "main": {"temp": round(18 + 8 * self.random.random(), 2)},
+                "weather": [{"main": main, "description": description}],
+                "pop": round(self.random.random(), 2)
+            })
+        return {"cod": "200", "cnt": len(entries), "list": entries, "city": {"name": city, "timezone": 0}}
+
+    def completion(self, prompt):
+        match = USER_PROMPT_RE.search(prompt)
+        if match:
+            question = match.group(1)
+            city = CITY_RE.search(question)
+            date = DATE_RE.search(question)
+            return json.dumps({
+                "location": city.group(1) if city else "London",
+                "date": date.group(1) if date else "today"
+            })
+        return ("Here is your forecast: expect mostly pleasant conditions with comfortable "
+                "temperatures throughout the day, so plan accordingly and enjoy your time outside.")
@@ -0,0 +1,285 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_upstream import FakeUpstream
+
+CITIES = ["Karachi", "Lahore", "Islamabad", "London", "Paris", "Tokyo", "Dubai", "Berlin",
+          "Madrid", "Cairo", "Toronto", "Sydney", "Istanbul", "Moscow", "Delhi", "Seoul"]
+DATES = ["today", "tomorrow"]
+SCENARIOS = ["single_query", "cache", "stdio_throughput", "cold_start", "import_time"]
+# Modules that must stay out of the server's startup path
+LAZY_MODULES = ["dateparser"]
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 3)
+    }
+
+def question(i):
+    return f"What's the weather in {CITIES[i % len(CITIES)]} {DATES[(i // len(CITIES)) % len(DATES)]}?"
+
+async def timed(samples, coro):
+    started = time.perf_counter()
+    result = await coro
+    samples.append(time.perf_counter() - started)
+    return result
+
+async def bench_single_query(args):
+    # Imported late so the base-URL overrides in the environment are picked up
+    from tools import weather, llm_extractor, llm_responder, fast_extractor
+    from tools.template_responder import render_weather_response
+
+    stages = {name: [] for name in (
+        "extract_fast", "extract_llm", "forecast_fetch", "forecast_lookup", "respond_llm", "respond_template"
+    )}
+
+    async def noop(_):
+        pass
+
+    for i in range(args.iterations):
+        city = CITIES[i % len(CITIES)]
+        user_input = question(i)
+
+        started = time.perf_counter()
+        fast_extractor.fast_extract(user_input)
+        stages["extract_fast"].append(time.perf_counter() - started)
+
+        llm_extractor.extraction_cache.clear()
+        await timed(stages["extract_llm"], llm_extractor.extract_location_date_async(user_input))
+
+        weather.forecast_cache.clear()
+        index = await timed(stages["forecast_fetch"], weather.get_forecast_index(city))
+
+        started = time.perf_counter()
+        target_date, _ = await weather.resolve_target_date("tomorrow")
+        forecast = weather.lookup_forecast(index, target_date)
+        stages["forecast_lookup"].append(time.perf_counter() - started)
+
+        await timed(stages["respond_llm"], llm_responder.generate_weather_response_async(
+            user_input, city, "tomorrow", forecast["description"], forecast["temperature"],
+            on_token=noop if args.stream else None
+        ))
+
+        started = time.perf_counter()
+        render_weather_response(city, "tomorrow", forecast)
+        stages["respond_template"].append(time.perf_counter() - started)
+
+    return {stage: summarize(samples) for stage, samples in stages.items()}
+
+async def bench_cache(args):
+    from tools import weather, llm_extractor
+
+    results = {"forecast_miss": [], "forecast_hit": [], "extraction_miss": [], "extraction_hit": []}
+    weather.forecast_cache.clear()
+    llm_extractor.extraction_cache.clear()
+    for i in range(args.iterations):
+        city = f"{CITIES[i % len(CITIES)]}"
+        weather.forecast_cache.invalidate(weather.forecast_query(city)[0])
+        await timed(results["forecast_miss"], weather.get_weather_forecast_async(city, "today"))
+        await timed(results["forecast_hit"], weather.get_weather_forecast_async(city, "tomorrow"))
+
+        user_input = question(i) + f" #{i}"
+        await timed(results["extraction_miss"], llm_extractor.extract_location_date_async(user_input))
+        await timed(results["extraction_hit"], llm_extractor.extract_location_date_async(user_input.upper()))
+
+    summary = {name: summarize(samples) for name, samples in results.items()}
+    summary["forecast_cache"] = weather.get_forecast_cache_stats()
+    summary["extraction_cache"] = llm_extractor.get_extraction_cache_stats()
+    return summary
+
+async def bench_stdio_throughput(args):
+    from mcp_client import MCPClient
+
+    results = {}
+    for concurrency in args.concurrency:
+        client = MCPClient(timeout=120)
+        await client.start()
+        await client.initialize()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        errors = 0
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                try:
+                    await timed(latencies, client.call_tool("process_weather_query", {"user_input": question(i)}))
+                except Exception:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+        server_stats = await client.stats()
+        await client.stop()
+
+        results[str(concurrency)] = {
+            "requests": args.requests,
+            "errors": errors,
+            "elapsed_s": round(elapsed, 3),
+            "qps": round(args.requests / elapsed, 2),
+            "latency": summarize(latencies),
+            "server_stats": server_stats
+        }
+    return results
+
+async def bench_cold_start(args):
+    from mcp_client import MCPClient
+
+    to_initialize = []
+    to_tools_list = []
+    for _ in range(args.cold_starts):
+        client = MCPClient()
+        started = time.perf_counter()
+        await client.start()
+        await client.initialize()
+        to_initialize.append(time.perf_counter() - started)
+        await client.list_tools()
+        to_tools_list.append(time.perf_counter() - started)
+        await client.stop()
+    return {"initialize": summarize(to_initialize), "tools_list": summarize(to_tools_list)}
+
+async def bench_import_time(args):
+    # Fresh interpreter each time, so nothing is already in sys.modules
+    probe = f"import sys, json, mcp_server; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    samples = []
+    eager = set()
+    for _ in range(args.cold_starts):
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", probe, cwd=ROOT, stdout=asyncio.subprocess.PIPE
+        )
+        out, _ = await process.communicate()
+        samples.append(time.perf_counter() - started)
+        eager.update(json.loads(out or b"[]"))
+    return {"import": summarize(samples), "budget_ms": args.import_budget_ms, "eager_modules": sorted(eager)}
+
+def check_import_budget(results):
+    summary = results.get("import_time")
+    if not summary:
+        return []
+    problems = []
+    if summary["import"]["p50_ms"] > summary["budget_ms"]:
+        problems.append({"metric": "import_time.import.p50_ms", "baseline": summary["budget_ms"],
+                         "current": summary["import"]["p50_ms"]})
+    for module in summary["eager_modules"]:
+        problems.append({"metric": f"import_time.eager.{module}", "baseline": "lazy", "current": "imported"})
+    return problems
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, path + ".")
+        else:
+            yield path, value
+
+def compare(baseline, current, threshold):
+    base = dict(flatten(baseline.get("results", {})))
+    regressions = []
+    for path, value in flatten(current.get("results", {})):
+        old = base.get(path)
+        if not isinstance(old, (int, float)) or not isinstance(value, (int, float)) or not old:
+            continue
+        if path.endswith(("p50_ms", "p95_ms", "p99_ms")) and value > old * (1 + threshold):
+            regressions.append({"metric": path, "baseline": old, "current": value})
+        elif path.endswith(".qps") and value < old * (1 - threshold):
+            regressions.append({"metric": path, "baseline": old, "current": value})
+    return regressions
+
+async def run(args):
+    weather_fake = FakeUpstream(args.latency_ms, args.jitter_ms, args.rate_429, args.token_delay_ms, seed=1)
+    together_fake = FakeUpstream(args.latency_ms, args.jitter_ms, args.rate_429, args.token_delay_ms, seed=2)
+    os.environ["OPENWEATHER_BASE_URL"] = await weather_fake.start()
+    os.environ["TOGETHER_BASE_URL"] = await together_fake.start()
+    os.environ["OPENWEATHER_API_KEY"] = "benchmark"
+    os.environ["TOGETHER_API_KEY"] = "benchmark"
+
+    benches = {
+        "single_query": bench_single_query,
+        "cache": bench_cache,
+        "stdio_throughput": bench_stdio_throughput,
+        "cold_start": bench_cold_start,
+        "import_time": bench_import_time
+    }
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            print(f"⏱️ {scenario}...", file=sys.stderr)
+            results[scenario] = await benches[scenario](args)
+    finally:
+        from tools import http_client
+        await http_client.aclose()
+        await weather_fake.stop()
+        await together_fake.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+        },
+        "upstream_requests": {"openweather": weather_fake.requests, "together": together_fake.requests},
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local fake upstreams")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--cold-starts", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=400,
+                        help="p50 wall time allowed for a fresh `import mcp_server`")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--token-delay-ms", type=float, default=5)
+    parser.add_argument("--stream", action="store_true", help="stream LLM responses in single_query")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(json.load(f), report, args.threshold)
+    budget = check_import_budget(report["results"])
+    if budget:
+        report["regressions"] = report.get("regressions", []) + budget
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {args.output}", file=sys.stderr)
+
+    if report.get("regressions"):
+        for regression in report["regressions"]:
+            print(f"❌ {regression['metric']}: {regression['baseline']} -> {regression['current']}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
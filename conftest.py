@@ -0,0 +1 @@
+# Lets the tests import tools.* and the server modules from the repository root
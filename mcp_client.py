@@ -1,63 +1,348 @@
-import json
 import asyncio
-import subprocess
+import os
 import sys
+import time
+import zlib
+import httpx
+from tools import json_codec
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_server.py")
+# e.g. http://127.0.0.1:8765/mcp to share one `mcp_server.py --http` instead of spawning a server
+SERVER_URL = os.getenv("MCP_SERVER_URL", "")
+DEFAULT_TIMEOUT = float(os.getenv("MCP_CLIENT_TIMEOUT", "60"))
+STREAM_LIMIT = 16 * 1024 * 1024
 
 class MCPClient:
-    def __init__(self):
+    def __init__(self, timeout=DEFAULT_TIMEOUT, on_notification=None):
         self.process = None
         self.request_id = 0
+        self.timeout = timeout
+        self.on_notification = on_notification
+        self.pending = {}
+        self.progress_handlers = {}
+        self.reader = None
+        self.write_lock = asyncio.Lock()
 
     async def start(self):
-        self.process = subprocess.Popen(
-            [sys.executable, "mcp_server.py"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            text=True,
-            bufsize=1
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, SERVER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT
         )
-        print("🚀 Started MCP server")
+        self.reader = asyncio.create_task(self.read_loop())
 
     async def stop(self):
-        if self.process:
-            self.process.terminate()
-            self.process.wait()
+        if self.process and self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.terminate()
+                await self.process.wait()
+        if self.reader:
+            await asyncio.gather(self.reader, return_exceptions=True)
+
+    async def read_loop(self):
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json_codec.loads(line)
+                except ValueError:
+                    continue
+                self.route(message)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(Exception("MCP server exited"))
+            self.pending.clear()
+
+    def route(self, message):
+        if "id" in message and "method" not in message:
+            future = self.pending.pop(message["id"], None)
+            if future is not None and not future.done():
+                future.set_result(message)
+            return
 
-    async def send(self, method, params=None):
+        params = message.get("params") or {}
+        if message.get("method") == "notifications/progress":
+            handler = self.progress_handlers.get(params.get("progressToken"))
+            if handler:
+                handler(params)
+                return
+        if self.on_notification:
+            self.on_notification(message)
+
+    async def send(self, method, params=None, timeout=None, on_progress=None):
         self.request_id += 1
+        request_id = self.request_id
+        params = dict(params or {})
+        if on_progress:
+            params["_meta"] = {**params.get("_meta", {}), "progressToken": request_id}
+            self.progress_handlers[request_id] = on_progress
         message = {
             "jsonrpc": "2.0",
-            "id": self.request_id,
+            "id": request_id,
             "method": method,
-            "params": params or {}
+            "params": params
         }
 
-        message_str = json.dumps(message) + "\n"
-        self.process.stdin.write(message_str)
-        self.process.stdin.flush()
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            async with self.write_lock:
+                self.process.stdin.write(json_codec.dumps(message) + b"\n")
+                await self.process.stdin.drain()
+            response = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Request {method} timed out")
+        finally:
+            self.pending.pop(request_id, None)
+            self.progress_handlers.pop(request_id, None)
+
+        if "error" in response:
+            raise Exception(f"Server error: {response['error']['message']}")
+
+        return response["result"]
+
+    async def initialize(self):
+        return await self.send("initialize")
+
+    async def list_tools(self):
+        return await self.send("tools/list")
+
+    async def stats(self):
+        return await self.send("server/stats")
+
+    async def call_tool(self, name, arguments, timeout=None, on_progress=None):
+        return await self.send("tools/call", {"name": name, "arguments": arguments}, timeout, on_progress)
+
+class MCPHTTPClient:
+    def __init__(self, url=None, timeout=DEFAULT_TIMEOUT, on_notification=None):
+        self.url = url or SERVER_URL
+        self.timeout = timeout
+        self.on_notification = on_notification
+        self.request_id = 0
+        self.session_id = None
+        self.http = None
+
+    async def start(self):
+        self.http = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=5))
 
-        response_line = self.process.stdout.readline()
-        response = json.loads(response_line.strip())
+    async def stop(self):
+        if self.http is None:
+            return
+        if self.session_id:
+            try:
+                await self.http.delete(self.url, headers={"Mcp-Session-Id": self.session_id})
+            except httpx.HTTPError:
+                pass
+        await self.http.aclose()
+
+    async def send(self, method, params=None, timeout=None, on_progress=None):
+        self.request_id += 1
+        request_id = self.request_id
+        params = dict(params or {})
+        if on_progress:
+            params["_meta"] = {**params.get("_meta", {}), "progressToken": request_id}
+        message = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": method,
+            "params": params
+        }
+        headers = {"Accept": "application/json, text/event-stream"}
+        if self.session_id:
+            headers["Mcp-Session-Id"] = self.session_id
+
+        try:
+            response = await asyncio.wait_for(self.post(message, headers, on_progress), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Request {method} timed out")
 
         if "error" in response:
             raise Exception(f"Server error: {response['error']['message']}")
 
         return response["result"]
 
+    async def post(self, message, headers, on_progress):
+        async with self.http.stream("POST", self.url, json=message, headers=headers) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode(errors="replace")
+                raise Exception(f"MCP server returned HTTP {response.status_code}: {body}")
+            self.session_id = response.headers.get("mcp-session-id", self.session_id)
+            if not response.headers.get("content-type", "").startswith("text/event-stream"):
+                return json_codec.loads(await response.aread())
+
+            reply = None
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json_codec.loads(line[5:])
+                if "id" in event and "method" not in event:
+                    reply = event
+                elif event.get("method") == "notifications/progress" and on_progress:
+                    on_progress(event.get("params") or {})
+                elif self.on_notification:
+                    self.on_notification(event)
+            if reply is None:
+                raise Exception("MCP server closed the stream without a reply")
+            return reply
+
     async def initialize(self):
         return await self.send("initialize")
 
     async def list_tools(self):
         return await self.send("tools/list")
 
-    async def call_tool(self, name, arguments):
-        return await self.send("tools/call", {"name": name, "arguments": arguments})
+    async def stats(self):
+        return await self.send("server/stats")
+
+    async def call_tool(self, name, arguments, timeout=None, on_progress=None):
+        return await self.send("tools/call", {"name": name, "arguments": arguments}, timeout, on_progress)
+
+class PoolWorker:
+    def __init__(self, index, client):
+        self.index = index
+        self.client = client
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.restarts = 0
+        self.latency_ms = None
+
+    @property
+    def alive(self):
+        process = self.client.process
+        return process is not None and process.returncode is None
+
+    def record(self, started, failed):
+        elapsed = (time.perf_counter() - started) * 1000
+        # Exponentially weighted so the figure follows recent load
+        self.latency_ms = elapsed if self.latency_ms is None else 0.8 * self.latency_ms + 0.2 * elapsed
+        self.completed += 1
+        if failed:
+            self.errors += 1
+
+    def stats(self):
+        return {
+            "worker": self.index,
+            "pid": self.client.process.pid if self.client.process else None,
+            "alive": self.alive,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "latency_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None
+        }
+
+class MCPClientPool:
+    def __init__(self, size=None, timeout=DEFAULT_TIMEOUT, affinity_slack=None):
+        self.size = size or int(os.getenv("MCP_POOL_SIZE", str(os.cpu_count() or 1)))
+        self.timeout = timeout
+        # How many extra in-flight calls the affine worker may carry before load wins
+        self.affinity_slack = affinity_slack if affinity_slack is not None else int(os.getenv("MCP_POOL_AFFINITY_SLACK", "2"))
+        self.workers = []
+        self.watchers = []
+        self.init_result = None
+        self.draining = False
+
+    async def start_worker(self, index):
+        client = MCPClient(self.timeout)
+        await client.start()
+        try:
+            self.init_result = await client.initialize()
+        except BaseException:
+            await client.stop()
+            raise
+        return client
+
+    async def start(self):
+        clients = await asyncio.gather(*(self.start_worker(i) for i in range(self.size)), return_exceptions=True)
+        errors = [client for client in clients if isinstance(client, BaseException)]
+        if errors:
+            # One worker that cannot start fails the pool; the ones that did are not left running
+            await asyncio.gather(*(client.stop() for client in clients if isinstance(client, MCPClient)),
+                                 return_exceptions=True)
+            raise errors[0]
+        self.workers = [PoolWorker(i, client) for i, client in enumerate(clients)]
+        self.watchers = [asyncio.create_task(self.watch(worker)) for worker in self.workers]
+
+    async def watch(self, worker):
+        while not self.draining:
+            await worker.client.process.wait()
+            if self.draining:
+                return
+            print(f"⚠️ MCP worker {worker.index} exited; restarting", file=sys.stderr)
+            await worker.client.stop()
+            try:
+                worker.client = await self.start_worker(worker.index)
+                worker.restarts += 1
+            except Exception as e:
+                print(f"❌ Could not restart MCP worker {worker.index}: {e}", file=sys.stderr)
+                await asyncio.sleep(1)
+
+    async def stop(self, drain_timeout=30):
+        self.draining = True
+        deadline = time.monotonic() + drain_timeout
+        while any(worker.in_flight for worker in self.workers) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for watcher in self.watchers:
+            watcher.cancel()
+        await asyncio.gather(*self.watchers, return_exceptions=True)
+        await asyncio.gather(*(worker.client.stop() for worker in self.workers), return_exceptions=True)
+
+    def pick(self, affinity=None):
+        workers = [worker for worker in self.workers if worker.alive] or self.workers
+        least = min(workers, key=lambda worker: (worker.in_flight, worker.latency_ms or 0))
+        if affinity:
+            preferred = self.workers[zlib.crc32(affinity.strip().lower().encode()) % len(self.workers)]
+            if preferred.alive and preferred.in_flight <= least.in_flight + self.affinity_slack:
+                return preferred
+        return least
+
+    async def send(self, method, params=None, timeout=None, on_progress=None, affinity=None):
+        if self.draining:
+            raise Exception("MCP client pool is shutting down")
+        worker = self.pick(affinity)
+        worker.in_flight += 1
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = await worker.client.send(method, params, timeout, on_progress)
+            failed = False
+            return result
+        finally:
+            worker.in_flight -= 1
+            worker.record(started, failed)
+
+    async def initialize(self):
+        return self.init_result
+
+    async def list_tools(self):
+        return await self.send("tools/list")
+
+    async def stats(self):
+        return await self.send("server/stats")
+
+    async def call_tool(self, name, arguments, timeout=None, on_progress=None, affinity=None):
+        # Same-city forecasts go to the same worker so its forecast cache stays hot
+        affinity = affinity or arguments.get("location")
+        return await self.send("tools/call", {"name": name, "arguments": arguments}, timeout, on_progress, affinity)
+
+    def pool_stats(self):
+        return [worker.stats() for worker in self.workers]
 
 async def main():
-    client = MCPClient()
+    client = MCPHTTPClient(SERVER_URL) if SERVER_URL else MCPClient()
+    loop = asyncio.get_running_loop()
 
     try:
         await client.start()
+        print(f"🔗 Connected to MCP server at {SERVER_URL}" if SERVER_URL else "🚀 Started MCP server")
 
         init_result = await client.initialize()
         print(f"✅ Server: {init_result['serverInfo']['name']} v{init_result['serverInfo']['version']}")
@@ -74,7 +359,7 @@ async def main():
 
         while True:
             try:
-                user_input = input("You: ").strip()
+                user_input = (await loop.run_in_executor(None, input, "You: ")).strip()
 
                 if user_input.lower() in ["exit", "quit"]:
                     print("👋 Goodbye!")
@@ -85,14 +370,28 @@ async def main():
 
                 print("🤖 Processing...")
 
-                result = await client.call_tool("process_weather_query", {"user_input": user_input})
+                streamed = []
+
+                def show_partial(params):
+                    if not streamed:
+                        print("🤖 ", end="")
+                    streamed.append(params.get("message", ""))
+                    print(params.get("message", ""), end="", flush=True)
+
+                result = await client.call_tool(
+                    "process_weather_query", {"user_input": user_input}, on_progress=show_partial
+                )
+                if streamed:
+                    print()
 
-                if "Error:" in result["content"][0]["text"]:
-                    print(f"❌ {result['content'][0]['text']}")
-                else:
-                    print("🤖", result["content"][0]["text"])
+                text = result["content"][0]["text"]
+                if result.get("isError"):
+                    print(f"❌ {text}")
+                elif "".join(streamed).strip() != text.strip():
+                    # e.g. auto mode fell back to the template after streaming began
+                    print("🤖", text)
 
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\n👋 Goodbye!")
                 break
             except Exception as e:
@@ -102,4 +401,4 @@ async def main():
         await client.stop()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -1,23 +1,221 @@
-import json
 import asyncio
+import argparse
 import os
+import secrets
+import signal
+import sys
+import time
+from urllib.parse import urlparse
 from dotenv import load_dotenv
-from tools.weather import get_weather_forecast
-from tools.llm_extractor import extract_location_date
-from tools.llm_responder import generate_weather_response
+from tools import http_client, json_codec, metrics, resilience, together_scheduler
+from tools.weather import get_weather_forecast_async, get_weather_forecasts_async, get_forecast_cache_stats
+from tools.weather import get_weather_range_async, forecast_query, resolve_target_date, resolve_target_range
+from tools.date_resolver import resolve_range_async
+from tools.fast_extractor import extract_query_async, get_extractor_stats
+from tools.llm_extractor import get_extraction_cache_stats, normalize_prompt
+from tools.llm_responder import generate_weather_response_async, generate_range_response_async
+from tools.template_responder import render_weather_response, render_range_response
+from tools.response_cache import memoized, intent_of, get_response_cache_stats
+from tools.disk_cache import get_disk_cache_stats
+from tools.city_index import find_city_candidates
+from tools.singleflight import SingleFlight
+from tools.prefetch import PrefetchScheduler, PREFETCH_ENABLED
 
 load_dotenv()
 
+MAX_BATCH_SIZE = int(os.getenv("MCP_MAX_BATCH_SIZE", "100"))
+RATE_LIMITED = "Error: Rate limit exceeded."
+RESPONSE_MODES = ["llm", "template", "auto"]
+
+RESPONSE_OPTIONS = {
+    "response_mode": {"type": "string", "enum": RESPONSE_MODES},
+    "language": {"type": "string", "enum": ["en", "es", "fr", "de"]}
+}
+
+FORECAST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "date": {"type": "string", "format": "date"},
+        "description": {"type": "string"},
+        "temperature": {"type": "number"},
+        "temp_min": {"type": "number"},
+        "temp_max": {"type": "number"},
+        "precipitation_probability": {"type": "number"},
+        "hour": {"type": "integer"}
+    },
+    "required": ["date", "description", "temperature"]
+}
+
+RANGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "start": {"type": "string", "format": "date"},
+        "end": {"type": "string", "format": "date"},
+        "clipped": {"type": "boolean"},
+        "description": {"type": "string"},
+        "temperature": {"type": "number"},
+        "temp_min": {"type": "number"},
+        "temp_max": {"type": "number"},
+        "precipitation_probability": {"type": "number"},
+        "days": {
+            "type": "array",
+            "items": {
+                **FORECAST_SCHEMA,
+                "properties": {
+                    **FORECAST_SCHEMA["properties"],
+                    "hourly": {"type": "array", "items": {
+                        "type": "object",
+                        "properties": {k: FORECAST_SCHEMA["properties"][k] for k in
+                                       ("hour", "description", "temperature", "precipitation_probability")}
+                    }}
+                }
+            }
+        }
+    },
+    "required": ["start", "end", "days"]
+}
+
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "location": {"type": "string"},
+        "date": {"type": "string"},
+        "resolved_date": {"type": "string", "format": "date"},
+        "confidence": {"type": "number"}
+    },
+    "required": ["location", "date"]
+}
+
+QUERY_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "input": {"type": "string"},
+        "location": {"type": "string"},
+        "date": {"type": "string"},
+        "forecast": {"anyOf": [FORECAST_SCHEMA, RANGE_SCHEMA]},
+        "response": {"type": "string"},
+        "error": {"type": "string"}
+    },
+    "required": ["input"]
+}
+
+ERROR_SCHEMA = {
+    "type": "object",
+    "properties": {"error": {"type": "string"}},
+    "required": ["error"]
+}
+
+# Tools that can fail return {"error": ...} as their structured result
+def or_error(schema):
+    return {"type": "object", "anyOf": [schema, ERROR_SCHEMA]}
+
+def batch_schema(item_schema):
+    return {
+        "type": "object",
+        "properties": {"results": {"type": "array", "items": item_schema}},
+        "required": ["results"]
+    }
+
+# Structured results carry the object itself; the text block is the same data as JSON
+# (or the answer text) for clients that only read content
+def structured(result, text=None, is_error=False):
+    return {
+        "content": [{"type": "text", "text": text if text is not None else json_codec.dumps_text(result)}],
+        "structuredContent": result,
+        "isError": is_error
+    }
+
+def tool_error(message):
+    return structured({"error": message}, message, is_error=True)
+
+def check_extraction(extracted):
+    if not extracted:
+        return "Error: Could not extract location and date"
+    if not isinstance(extracted, dict) or "location" not in extracted or "date" not in extracted:
+        return "Error: Invalid extracted data"
+    return None
+
+async def is_span(extracted):
+    return await resolve_range_async(extracted["date"]) is not None
+
+def check_batch(items):
+    if not isinstance(items, list):
+        raise Exception("Batch input must be a list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise Exception(f"Batch too large: {len(items)} items (max {MAX_BATCH_SIZE})")
+
+async def traced(name, coro):
+    with metrics.span(name):
+        return await coro
+
 class WeatherMCPServer:
     def __init__(self):
         self.initialized = False
+        self.response_mode = os.getenv("RESPONSE_MODE", "llm")
+        self.response_budget = float(os.getenv("RESPONSE_LATENCY_BUDGET", "3"))
+        self.language = os.getenv("RESPONSE_LANGUAGE", "en")
+        # Identical questions share one pipeline run; different wordings of the same
+        # (city, date) share one generated answer
+        self.query_flights = SingleFlight()
+        self.answer_flights = SingleFlight()
+        self.prefetcher = PrefetchScheduler() if PREFETCH_ENABLED else None
         self.tools = {
             "get_weather_forecast": {
                 "description": "Get weather forecast for location and date",
                 "inputSchema": {
                     "type": "object",
-                    "properties": {"location": {"type": "string"}, "date": {"type": "string"}},
+                    "properties": {
+                        "location": {"type": "string"},
+                        "date": {"type": "string"},
+                        "hour": {"type": "integer", "minimum": 0, "maximum": 23}
+                    },
+                    "required": ["location", "date"]
+                },
+                "outputSchema": or_error(FORECAST_SCHEMA)
+            },
+            "get_weather_range": {
+                "description": "Per-day and hourly forecast for a span such as \"this weekend\", \"next 3 days\" "
+                               "or \"Monday to Wednesday\", clipped to the 5-day horizon, from one fetch",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "location": {"type": "string"},
+                        "date": {"type": "string"},
+                        "hourly": {"type": "boolean"}
+                    },
                     "required": ["location", "date"]
+                },
+                "outputSchema": or_error(RANGE_SCHEMA)
+            },
+            "resolve_city": {
+                "description": "Resolve a city name, alias or misspelling to ranked known cities with coordinates",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "limit": {"type": "integer", "minimum": 1, "maximum": 20}
+                    },
+                    "required": ["name"]
+                },
+                "outputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "candidates": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "id": {"type": "string"},
+                                    "name": {"type": "string"},
+                                    "country": {"type": "string"},
+                                    "lat": {"type": "number"},
+                                    "lon": {"type": "number"},
+                                    "score": {"type": "number"}
+                                }
+                            }
+                        }
+                    },
+                    "required": ["candidates"]
                 }
             },
             "extract_location_date": {
@@ -26,15 +224,53 @@ class WeatherMCPServer:
                     "type": "object",
                     "properties": {"user_input": {"type": "string"}},
                     "required": ["user_input"]
-                }
+                },
+                "outputSchema": or_error(EXTRACTION_SCHEMA)
             },
             "process_weather_query": {
                 "description": "Complete weather query processing",
                 "inputSchema": {
                     "type": "object",
-                    "properties": {"user_input": {"type": "string"}},
+                    "properties": {"user_input": {"type": "string"}, **RESPONSE_OPTIONS},
                     "required": ["user_input"]
-                }
+                },
+                "outputSchema": QUERY_RESULT_SCHEMA
+            },
+            "get_weather_forecasts": {
+                "description": "Get weather forecasts for a batch of locations and dates",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "queries": {
+                            "type": "array",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "location": {"type": "string"},
+                                    "date": {"type": "string"},
+                                    "hour": {"type": "integer", "minimum": 0, "maximum": 23},
+                                    "span": {"type": "boolean"},
+                                    "hourly": {"type": "boolean"}
+                                },
+                                "required": ["location", "date"]
+                            }
+                        }
+                    },
+                    "required": ["queries"]
+                },
+                "outputSchema": batch_schema({
+                    "type": "object",
+                    "properties": {"result": {"anyOf": [FORECAST_SCHEMA, RANGE_SCHEMA]}, "error": {"type": "string"}}
+                })
+            },
+            "process_weather_queries": {
+                "description": "Complete weather query processing for a batch of questions",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {"user_inputs": {"type": "array", "items": {"type": "string"}}, **RESPONSE_OPTIONS},
+                    "required": ["user_inputs"]
+                },
+                "outputSchema": batch_schema(QUERY_RESULT_SCHEMA)
             }
         }
     
@@ -43,95 +279,586 @@ class WeatherMCPServer:
             raise Exception("Missing API keys")
         self.initialized = True
         return {
-            "protocolVersion": "2024-11-05",
+            "protocolVersion": "2025-06-18",
             "capabilities": {"tools": {}},
             "serverInfo": {"name": "weather-mcp-server", "version": "1.0.0"}
         }
     
+    def start_background(self):
+        if self.prefetcher:
+            self.prefetcher.start()
+
+    async def stop_background(self):
+        if self.prefetcher:
+            await self.prefetcher.stop()
+
     async def list_tools(self):
-        return [{"name": k, "description": v["description"], "inputSchema": v["inputSchema"]} 
-                for k, v in self.tools.items()]
+        return [{"name": k, **v} for k, v in self.tools.items()]
+    
+    async def stats(self):
+        return {
+            "forecast_cache": get_forecast_cache_stats(),
+            "extractor": get_extractor_stats(),
+            "extraction_cache": get_extraction_cache_stats(),
+            "upstream": http_client.get_upstream_stats(),
+            "breakers": resilience.get_breaker_stats(),
+            # A COUNT over the SQLite file, so off the event loop
+            "disk_cache": await asyncio.to_thread(get_disk_cache_stats),
+            "coalescing": {"query": self.query_flights.stats(), "answer": self.answer_flights.stats()},
+            "prefetch": self.prefetcher.get_stats() if self.prefetcher else None,
+            "together": together_scheduler.get_scheduler_stats(),
+            "response_cache": get_response_cache_stats()
+        }
+    
+    async def metrics(self, params):
+        caches = {
+            "forecast_cache": get_forecast_cache_stats(),
+            "extraction_cache": get_extraction_cache_stats()
+        }
+        cache_counters = {
+            f"{cache}.{field}": stats[field]
+            for cache, stats in caches.items() for field in ("hits", "misses", "coalesced", "evictions")
+        }
+        for name, flights in (("query", self.query_flights), ("answer", self.answer_flights)):
+            cache_counters[f"coalescing.{name}.leaders"] = flights.leaders
+            cache_counters[f"coalescing.{name}.coalesced"] = flights.coalesced
+        responses = get_response_cache_stats()
+        for field in ("hits", "misses", "invalidated"):
+            cache_counters[f"response_cache.{field}"] = responses[field]
+        if params.get("format") == "prometheus":
+            return {"text": metrics.prometheus(cache_counters)}
+        snapshot = metrics.snapshot()
+        snapshot["counters"].update(cache_counters)
+        return snapshot
+    
+    async def respond(self, user_input, extracted, weather, mode, language, on_token=None, place=None):
+        location, date = extracted["location"], extracted["date"]
+        # A span gets one answer covering every day in it
+        if "days" in weather:
+            template = lambda: render_range_response(location, weather, language)
+            generate = lambda emit: generate_range_response_async(user_input, location, date, weather, on_token=emit)
+        else:
+            template = lambda: render_weather_response(location, date, weather, language)
+            generate = lambda emit: generate_weather_response_async(
+                user_input, location, date, weather["description"], weather["temperature"], on_token=emit
+            )
+        # Near-identical questions about an unchanged forecast reuse an earlier LLM answer
+        llm = lambda emit: memoized(place, user_input, weather, lambda: generate(emit), emit)
+        if mode == "template":
+            return template()
+        if mode == "llm":
+            return await llm(on_token)
+
+        # auto: the template answers whenever the LLM misses its budget or fails. Once text
+        # has been streamed to the client the LLM answer is kept, however long it takes.
+        streaming = asyncio.Event()
+        emit = None
+        if on_token:
+            async def emit(text):
+                if await on_token(text) is not False:
+                    streaming.set()
+        task = asyncio.ensure_future(llm(emit))
+        try:
+            response = await asyncio.wait_for(asyncio.shield(task), self.response_budget)
+        except asyncio.TimeoutError:
+            if not streaming.is_set():
+                task.cancel()
+                return template()
+            response = await task
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if response.startswith("❌"):
+            return template()
+        return response
     
-    async def call_tool(self, name, arguments):
+    # Questions share an answer only when they ask the same kind of thing; the response
+    # cache keys on the same intent
+    async def answer_key(self, user_input, extracted, mode, language):
+        if await is_span(extracted):
+            span, _ = await resolve_target_range(extracted["date"])
+            when = span[:2] if span else extracted["date"]
+        else:
+            target_date, _ = await resolve_target_date(extracted["date"])
+            when = target_date or extracted["date"]
+        return (forecast_query(extracted["location"])[0], when, intent_of(user_input), mode, language)
+
+    async def answer(self, user_input, extracted, weather, mode, language, on_token=None):
+        key = await self.answer_key(user_input, extracted, mode, language)
+        return await self.answer_flights.run(
+            key,
+            lambda emit: self.respond(user_input, extracted, weather, mode, language, emit, key[:2]),
+            on_token
+        )
+
+    async def process_query(self, user_input, on_token=None, mode=None, language=None):
+        mode = mode or self.response_mode
+        language = language or self.language
+        return await self.query_flights.run(
+            (normalize_prompt(user_input), mode, language),
+            lambda emit: self.process_queries([user_input], emit, mode, language),
+            on_token
+        )
+
+    async def process_queries(self, user_inputs, on_token=None, mode=None, language=None):
+        mode = mode or self.response_mode
+        language = language or self.language
+        if mode not in RESPONSE_MODES:
+            raise Exception(f"Unknown response mode: {mode}")
+
+        results = [{"input": user_input} for user_input in user_inputs]
+
+        extractions = await asyncio.gather(
+            *(traced("stage.extract", extract_query_async(user_input)) for user_input in user_inputs),
+            return_exceptions=True
+        )
+        resolved = []
+        for i, extracted in enumerate(extractions):
+            if isinstance(extracted, together_scheduler.RateLimited):
+                error = RATE_LIMITED
+            else:
+                error = f"Error: {extracted}" if isinstance(extracted, Exception) else check_extraction(extracted)
+            if error:
+                results[i]["error"] = error
+            else:
+                resolved.append((i, extracted))
+
+        # One upstream fetch per distinct city, however many questions or days mention it
+        spans = await asyncio.gather(*(is_span(extracted) for _, extracted in resolved))
+        forecasts = await traced("stage.forecast", get_weather_forecasts_async(
+            [{"location": extracted["location"], "date": extracted["date"], "span": span}
+             for (_, extracted), span in zip(resolved, spans)]
+        ))
+        answerable = []
+        for (i, extracted), forecast in zip(resolved, forecasts):
+            results[i]["location"], results[i]["date"] = extracted["location"], extracted["date"]
+            if "error" in forecast:
+                results[i]["error"] = "Error: Could not fetch weather data"
+            else:
+                results[i]["forecast"] = forecast["result"]
+                answerable.append((i, extracted, forecast["result"]))
+
+        responses = await asyncio.gather(*(
+            traced("stage.respond", self.answer(user_inputs[i], extracted, weather, mode, language, on_token))
+            for i, extracted, weather in answerable
+        ), return_exceptions=True)
+        for (i, _, _), response in zip(answerable, responses):
+            if isinstance(response, Exception):
+                results[i]["error"] = f"Error: {response}"
+            elif response.startswith("❌"):
+                # An LLM failure that no template covered (llm mode) is an error, not an answer
+                results[i]["error"] = "Error: " + response.removeprefix("❌ ").removeprefix("Error: ")
+            else:
+                results[i]["response"] = response
+        return results
+    
+    async def call_tool(self, name, arguments, on_token=None):
         if not self.initialized:
             raise Exception("Server not initialized")
-        
+        if name not in self.tools:
+            raise Exception(f"Tool '{name}' not found")
+
+        with metrics.span("tool." + name):
+            return await self.run_tool(name, arguments, on_token)
+    
+    async def run_tool(self, name, arguments, on_token):
         if name == "get_weather_forecast":
-            result = get_weather_forecast(arguments["location"], arguments["date"])
-            return {"content": [{"type": "text", "text": str(result)}]}
+            result = await get_weather_forecast_async(
+                arguments["location"], arguments["date"], arguments.get("hour")
+            )
+            if result is None:
+                return tool_error("Error: Could not fetch weather data")
+            return structured(result)
+        
+        elif name == "get_weather_range":
+            result = await get_weather_range_async(
+                arguments["location"], arguments["date"], arguments.get("hourly", True)
+            )
+            if result is None:
+                return tool_error("Error: Could not fetch weather data")
+            return structured(result)
+        
+        elif name == "resolve_city":
+            result = find_city_candidates(arguments["name"], arguments.get("limit", 5))
+            return structured({"candidates": result})
         
         elif name == "extract_location_date":
-            result = extract_location_date(arguments["user_input"])
-            return {"content": [{"type": "text", "text": str(result)}]}
+            try:
+                result = await extract_query_async(arguments["user_input"])
+            except together_scheduler.RateLimited:
+                return tool_error(RATE_LIMITED)
+            error = check_extraction(result)
+            if error:
+                return tool_error(error)
+            return structured(result)
         
         elif name == "process_weather_query":
-            user_input = arguments["user_input"]
-            
-            extracted = extract_location_date(user_input)
-            if not extracted:
-                return {"content": [{"type": "text", "text": "Error: Could not extract location and date"}]}
-            
-            if isinstance(extracted, str):
-                import re
-                try:
-                    match = re.search(r'{\s*"location"\s*:\s*".+?",\s*"date"\s*:\s*".+?"\s*}', extracted)
-                    if match:
-                        extracted = json.loads(match.group(0))
-                except:
-                    return {"content": [{"type": "text", "text": "Error: Could not parse extracted data"}]}
-            
-            if not isinstance(extracted, dict) or "location" not in extracted or "date" not in extracted:
-                return {"content": [{"type": "text", "text": "Error: Invalid extracted data"}]}
-            
-            weather = get_weather_forecast(extracted["location"], extracted["date"])
-            if not weather:
-                return {"content": [{"type": "text", "text": "Error: Could not fetch weather data"}]}
-            
-            response = generate_weather_response(
-                user_input, extracted["location"], extracted["date"],
-                weather["description"], weather["temperature"]
-            )
-            
-            return {"content": [{"type": "text", "text": response}]}
+            result = (await self.process_query(
+                arguments["user_input"], on_token, arguments.get("response_mode"), arguments.get("language")
+            ))[0]
+            if "error" in result:
+                return structured(result, result["error"], is_error=True)
+            return structured(result, result["response"])
+        
+        elif name == "get_weather_forecasts":
+            queries = arguments["queries"]
+            check_batch(queries)
+            results = await get_weather_forecasts_async(queries)
+            return structured({"results": results}, json_codec.dumps_text(results))
+        
+        elif name == "process_weather_queries":
+            user_inputs = arguments["user_inputs"]
+            check_batch(user_inputs)
+            # Batches queue behind interactive questions for Together quota
+            with together_scheduler.priority("batch"):
+                results = await self.process_queries(
+                    user_inputs, mode=arguments.get("response_mode"), language=arguments.get("language")
+                )
+            return structured({"results": results}, json_codec.dumps_text(results))
         
         else:
             raise Exception(f"Tool '{name}' not found")
 
-async def main():
-    server = WeatherMCPServer()
+MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "16"))
+REQUEST_TIMEOUT = float(os.getenv("MCP_REQUEST_TIMEOUT", "30"))
 
-    while True:
+# The real stdout carries only JSON-RPC, written as encoded bytes; main() points
+# sys.stdout at stderr for diagnostics
+protocol_out = sys.stdout.buffer
+
+async def write_message(message, lock):
+    line = json_codec.dumps(message) + b"\n"
+    async with lock:
+        protocol_out.write(line)
+        protocol_out.flush()
+
+# notify is the transport's coroutine for pushing a message to the client mid-request
+def progress_notifier(progress_token, notify):
+    progress = 0
+
+    async def on_token(text):
+        nonlocal progress
+        progress += 1
+        await notify({
+            "jsonrpc": "2.0",
+            "method": "notifications/progress",
+            "params": {"progressToken": progress_token, "progress": progress, "message": text}
+        })
+
+    return on_token
+
+async def dispatch(server, message, semaphore, notify):
+    method = message.get("method")
+    params = message.get("params", {})
+    request_id = message.get("id")
+
+    try:
+        if method == "initialize":
+            result = await server.initialize(params)
+        elif method == "tools/list":
+            result = await server.list_tools()
+        elif method == "server/stats":
+            result = await server.stats()
+        elif method == "server/metrics":
+            result = await server.metrics(params)
+        elif method == "tools/call":
+            # Clients opt in to streamed text by sending a progress token
+            meta = params.get("_meta") or {}
+            progress_token = meta.get("progressToken")
+            on_token = progress_notifier(progress_token, notify) if progress_token is not None else None
+            # Every upstream retry made for this call shares one deadline
+            with resilience.deadline(float(meta.get("timeout", REQUEST_TIMEOUT))):
+                async with semaphore:
+                    result = await server.call_tool(params["name"], params.get("arguments", {}), on_token)
+        else:
+            raise Exception(f"Unknown method: {method}")
+
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    except Exception as e:
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": -1, "message": str(e)}}
+
+async def handle_line(server, line, semaphore, lock):
+    try:
+        message = json_codec.loads(line)
+    except Exception as e:
+        await write_message({"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}}, lock)
+        return
+    if not isinstance(message, dict):
+        await write_message({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}, lock)
+        return
+
+    # Notifications carry no id and expect no response
+    if "id" not in message and str(message.get("method", "")).startswith("notifications/"):
+        return
+
+    response = await dispatch(server, message, semaphore, lambda notification: write_message(notification, lock))
+    await write_message(response, lock)
+
+HTTP_HOST = os.getenv("MCP_HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.getenv("MCP_HTTP_PORT", "8765"))
+HTTP_PATH = "/mcp"
+HTTP_MAX_BODY = int(os.getenv("MCP_HTTP_MAX_BODY", str(4 * 1024 * 1024)))
+SESSION_IDLE_TIMEOUT = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT", "3600"))
+DRAIN_TIMEOUT = float(os.getenv("MCP_DRAIN_TIMEOUT", "30"))
+ALLOWED_ORIGINS = {origin for origin in os.getenv("MCP_HTTP_ALLOWED_ORIGINS", "").split(",") if origin}
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# Streamable HTTP: JSON-RPC over POST on one endpoint. Replies are plain JSON unless the
+# client accepts text/event-stream and asked for progress, in which case notifications
+# and then the reply are sent as SSE events on the same response.
+class HTTPTransport:
+    def __init__(self, server, semaphore):
+        self.server = server
+        self.semaphore = semaphore
+        self.sessions = {}  # session id -> time.monotonic() of last request
+        self.connections = set()
+        self.busy = set()
+        self.handlers = set()
+        self.listener = None
+        self.draining = False
+
+    async def start(self, host, port):
+        self.listener = await asyncio.start_server(self.handle_connection, host, port, limit=HTTP_MAX_BODY)
+        return self.listener.sockets[0].getsockname()[:2]
+
+    async def shutdown(self, timeout=DRAIN_TIMEOUT):
+        # Stop accepting, let in-flight requests finish, then drop idle keep-alive connections
+        self.draining = True
+        self.listener.close()
+        for writer in self.connections - self.busy:
+            writer.close()
+        deadline = time.monotonic() + timeout
+        while self.busy and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        for writer in list(self.connections):
+            writer.close()
+        # Handlers still parked on an idle keep-alive read are cancelled and collected here
+        for task in self.handlers:
+            task.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.listener.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        self.connections.add(writer)
         try:
-            line = await asyncio.get_event_loop().run_in_executor(None, input)
-            if not line.strip():
-                continue
+            while not self.draining:
+                request = await read_http_request(reader)
+                if request is None:
+                    break
+                self.busy.add(writer)
+                try:
+                    keep_alive = await self.handle_request(*request, writer)
+                finally:
+                    self.busy.discard(writer)
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            await write_http_response(writer, e.status, str(e).encode(), keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # shutdown() cancels idle keep-alive connections; asyncio's stream callback
+            # would log a cancelled handler as an error, so end it normally
+            pass
+        finally:
+            self.connections.discard(writer)
+            self.handlers.discard(task)
+            writer.close()
+
+    async def handle_request(self, method, path, headers, body, writer):
+        keep_alive = headers.get("connection", "").lower() != "close"
+        try:
+            self.check_origin(headers)
+            if path.split("?", 1)[0] != HTTP_PATH:
+                raise HTTPError(404, "Not found")
+            if self.draining:
+                raise HTTPError(503, "Server is shutting down")
+            if method == "POST":
+                await self.handle_post(headers, body, writer, keep_alive)
+            elif method == "DELETE":
+                session_id = headers.get("mcp-session-id")
+                if self.sessions.pop(session_id, None) is None:
+                    raise HTTPError(404, "Unknown session")
+                await write_http_response(writer, 200, b"", keep_alive=keep_alive)
+            else:
+                # No server-initiated stream; notifications ride on the POST that caused them
+                await write_http_response(writer, 405, b"", {"Allow": "POST, DELETE"}, keep_alive)
+        except HTTPError as e:
+            body = json_codec.dumps({"jsonrpc": "2.0", "id": None, "error": {"code": -32000, "message": str(e)}})
+            await write_http_response(writer, e.status, body, {"Content-Type": "application/json"}, keep_alive)
+        return keep_alive
 
-            message = json.loads(line)
-            method = message.get("method")
-            params = message.get("params", {})
-            request_id = message.get("id")
+    def check_origin(self, headers):
+        # Guards a localhost server against DNS rebinding from web pages
+        origin = headers.get("origin")
+        if origin and urlparse(origin).hostname not in LOCAL_HOSTS and origin not in ALLOWED_ORIGINS:
+            raise HTTPError(403, f"Origin not allowed: {origin}")
 
-            try:
-                if method == "initialize":
-                    result = await server.initialize(params)
-                elif method == "tools/list":
-                    result = await server.list_tools()
-                elif method == "tools/call":
-                    result = await server.call_tool(params["name"], params.get("arguments", {}))
-                else:
-                    raise Exception(f"Unknown method: {method}")
+    def check_session(self, headers, messages):
+        self.expire_sessions()
+        if any(message.get("method") == "initialize" for message in messages):
+            session_id = secrets.token_hex(16)
+            self.sessions[session_id] = time.monotonic()
+            return session_id
+        session_id = headers.get("mcp-session-id")
+        if not session_id:
+            raise HTTPError(400, "Missing Mcp-Session-Id header")
+        if session_id not in self.sessions:
+            raise HTTPError(404, "Unknown session")
+        self.sessions[session_id] = time.monotonic()
+        return session_id
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - SESSION_IDLE_TIMEOUT
+        for session_id in [sid for sid, seen in self.sessions.items() if seen < cutoff]:
+            del self.sessions[session_id]
+
+    async def handle_post(self, headers, body, writer, keep_alive):
+        try:
+            payload = json_codec.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"Parse error: {e}")
+        batch = isinstance(payload, list)
+        messages = payload if batch else [payload]
+        if not messages or not all(isinstance(message, dict) for message in messages):
+            raise HTTPError(400, "Invalid JSON-RPC message")
+
+        session_id = self.check_session(headers, messages)
+        session_headers = {"Mcp-Session-Id": session_id}
+        requests = [message for message in messages if "id" in message and "method" in message]
+        if not requests:
+            # Notifications and client responses only
+            await write_http_response(writer, 202, b"", session_headers, keep_alive)
+            return
+
+        wants_progress = any(((message.get("params") or {}).get("_meta") or {}).get("progressToken") is not None
+                             for message in requests)
+        if wants_progress and "text/event-stream" in headers.get("accept", ""):
+            await self.stream_replies(requests, writer, session_headers)
+            return
+
+        async def drop(notification):
+            pass
+
+        replies = await asyncio.gather(*(dispatch(self.server, message, self.semaphore, drop) for message in requests))
+        reply = replies if batch else replies[0]
+        await write_http_response(writer, 200, json_codec.dumps(reply),
+                                  {"Content-Type": "application/json", **session_headers}, keep_alive)
+
+    async def stream_replies(self, requests, writer, session_headers):
+        lock = asyncio.Lock()
+        writer.write(http_head(200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                                     "Transfer-Encoding": "chunked", **session_headers}))
+
+        async def send_event(message):
+            event = b"event: message\ndata: " + json_codec.dumps(message) + b"\n\n"
+            async with lock:
+                writer.write(f"{len(event):X}\r\n".encode() + event + b"\r\n")
+                await writer.drain()
+
+        async def reply(message):
+            await send_event(await dispatch(self.server, message, self.semaphore, send_event))
+
+        await asyncio.gather(*(reply(message) for message in requests))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
 
-                response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+async def read_http_request(reader):
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > HTTP_MAX_BODY:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length)
+    return method.upper(), target, headers, body
+
+def http_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+async def write_http_response(writer, status, body, headers=None, keep_alive=True):
+    headers = {**(headers or {}), "Content-Length": str(len(body))}
+    if not keep_alive:
+        headers["Connection"] = "close"
+    writer.write(http_head(status, headers) + body)
+    await writer.drain()
 
-            except Exception as e:
-                response = {"jsonrpc": "2.0", "id": request_id, "error": {"code": -1, "message": str(e)}}
+async def serve_http(host, port):
+    server = WeatherMCPServer()
+    transport = HTTPTransport(server, asyncio.Semaphore(MAX_CONCURRENCY))
+    bound_host, bound_port = await transport.start(host, port)
+    server.start_background()
+    print(f"🌐 MCP server listening on http://{bound_host}:{bound_port}{HTTP_PATH}", file=sys.stderr)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    await stop.wait()
 
-            print(json.dumps(response))
+    print("🛑 Draining in-flight requests...", file=sys.stderr)
+    await transport.shutdown()
+    await server.stop_background()
+    await http_client.aclose()
 
-        except EOFError:
+async def serve_stdio():
+    server = WeatherMCPServer()
+    server.start_background()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    lock = asyncio.Lock()
+    pending = set()
+
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+        if not line:
             break
-        except Exception as e:
-            print(f"Error: {e}")
+        if not line.strip():
+            continue
+
+        task = asyncio.create_task(handle_line(server, line, semaphore, lock))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    await server.stop_background()
+    await http_client.aclose()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Weather MCP server")
+    parser.add_argument("--http", action="store_true", help="serve Streamable HTTP instead of stdio")
+    parser.add_argument("--host", default=HTTP_HOST)
+    parser.add_argument("--port", type=int, default=HTTP_PORT)
+    args = parser.parse_args()
+
+    sys.stdout = sys.stderr
+    if args.http:
+        await serve_http(args.host, args.port)
+    else:
+        await serve_stdio()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -1,73 +1,119 @@
 import streamlit as st
-import json
 import asyncio
-import subprocess
-import sys
+import atexit
+import os
+import queue
 import threading
 import time
-from typing import Optional
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from mcp_client import MCPClient, MCPClientPool, MCPHTTPClient, SERVER_URL
 
-class MCPClient:
+load_dotenv()
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "30"))
+POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "1"))
+WEATHER_HOST = urlparse(os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org")).hostname
+AI_HOST = urlparse(os.getenv("TOGETHER_BASE_URL", "https://api.together.xyz")).hostname
+
+class SharedMCPClient:
+    # Runs the async MCPClient on a private event loop so Streamlit's script threads
+    # can share one multiplexed server connection
     def __init__(self):
-        self.process = None
-        self.request_id = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="mcp-client-loop", daemon=True)
+        self.thread.start()
+        if SERVER_URL:
+            self.client = MCPHTTPClient(SERVER_URL)
+        else:
+            self.client = MCPClientPool(POOL_SIZE) if POOL_SIZE > 1 else MCPClient()
+        self.tools = []
+        self.health = {}
+        self.health_checked_at = None
+        self.probe = None
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
 
     def start(self):
-        self.process = subprocess.Popen(
-            [sys.executable, "mcp_server.py"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            text=True,
-            bufsize=1
-        )
+        self.run(self.client.start())
+        self.run(self.client.initialize())
+        self.tools = self.run(self.client.list_tools())
 
     def stop(self):
-        if self.process:
-            self.process.terminate()
-            self.process.wait()
-
-    def send(self, method, params=None):
-        self.request_id += 1
-        message = {
-            "jsonrpc": "2.0",
-            "id": self.request_id,
-            "method": method,
-            "params": params or {}
-        }
-
-        message_str = json.dumps(message) + "\n"
-        self.process.stdin.write(message_str)
-        self.process.stdin.flush()
-
-        response_line = self.process.stdout.readline()
-        response = json.loads(response_line.strip())
-
-        if "error" in response:
-            raise Exception(f"Server error: {response['error']['message']}")
-
-        return response["result"]
-
-    def initialize(self):
-        return self.send("initialize")
-
-    def list_tools(self):
-        return self.send("tools/list")
+        if self.probe:
+            self.loop.call_soon_threadsafe(self.probe.cancel)
+        self.run(self.client.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
 
     def call_tool(self, name, arguments):
-        return self.send("tools/call", {"name": name, "arguments": arguments})
+        return self.run(self.client.call_tool(name, arguments))
+
+    def call_tool_streaming(self, name, arguments, on_text):
+        # Progress arrives on the client loop; hand it back to the script thread to render
+        chunks = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self.client.call_tool(name, arguments, on_progress=lambda params: chunks.put(params.get("message", ""))),
+            self.loop
+        )
+        while not future.done() or not chunks.empty():
+            try:
+                on_text(chunks.get(timeout=0.05))
+            except queue.Empty:
+                pass
+        return future.result()
+
+    async def probe_health(self, interval):
+        while True:
+            try:
+                # Reads the server's own upstream counters; no OpenWeather or LLM traffic
+                upstream = (await self.client.stats()).get("upstream", {})
+                self.health = {host: upstream.get(host) for host in (WEATHER_HOST, AI_HOST)}
+                self.health_checked_at = time.time()
+            except Exception:
+                self.health = {}
+            await asyncio.sleep(interval)
+
+    def start_health_probe(self, interval):
+        async def create():
+            self.probe = asyncio.create_task(self.probe_health(interval))
+        self.run(create())
+
+@st.cache_resource
+def get_shared_client():
+    client = SharedMCPClient()
+    try:
+        client.start()
+    except Exception:
+        client.stop()
+        raise
+    client.start_health_probe(HEALTH_PROBE_INTERVAL)
+    atexit.register(client.stop)
+    return client
 
 def init_mcp_client():
     if 'mcp_client' not in st.session_state:
-        client = MCPClient()
         try:
-            client.start()
-            client.initialize()
-            st.session_state.mcp_client = client
+            st.session_state.mcp_client = get_shared_client()
             st.session_state.mcp_ready = True
         except Exception as e:
             st.error(f"Failed to start MCP server: {e}")
             st.session_state.mcp_ready = False
 
+# A 4xx such as an unknown city's 404 is the API answering; only an unreachable,
+# failing or throttling upstream counts against it
+def upstream_failing(stats):
+    status = stats["last_status"]
+    return bool(stats["last_error"]) and (status is None or status == 429 or status >= 500)
+
+def show_api_status(label, stats):
+    if not stats or not stats["requests"]:
+        st.info(f"⏳ {label}: No traffic yet")
+    elif upstream_failing(stats):
+        st.error(f"❌ {label}: Error ({stats['last_error']})")
+    else:
+        st.success(f"✅ {label}: Connected")
+
 def main():
     st.set_page_config(
         page_title="Weather MCP Assistant",
@@ -91,12 +137,8 @@ def main():
     # Sidebar
     with st.sidebar:
         st.header("🔧 MCP Tools")
-        try:
-            tools = st.session_state.mcp_client.list_tools()
-            for tool in tools:
-                st.write(f"• **{tool['name']}**: {tool['description']}")
-        except Exception as e:
-            st.error(f"Error listing tools: {e}")
+        for tool in st.session_state.mcp_client.tools:
+            st.write(f"• **{tool['name']}**: {tool['description']}")
 
         st.header("💡 Examples")
         st.markdown("""
@@ -122,20 +164,29 @@ def main():
 
         if st.button("🔍 Get Weather", type="primary"):
             if user_input.strip():
+                placeholder = st.empty()
+                streamed = []
+
+                def show_partial(text):
+                    streamed.append(text)
+                    placeholder.info(f"**Response:** {''.join(streamed).strip()}▌")
+
                 with st.spinner("🤖 Processing your request..."):
                     try:
-                        result = st.session_state.mcp_client.call_tool(
+                        result = st.session_state.mcp_client.call_tool_streaming(
                             "process_weather_query", 
-                            {"user_input": user_input}
+                            {"user_input": user_input},
+                            show_partial
                         )
                         
                         response_text = result["content"][0]["text"]
                         
-                        if "Error:" in response_text:
+                        if result.get("isError"):
+                            placeholder.empty()
                             st.error(response_text)
                         else:
                             st.success("✅ Weather information retrieved!")
-                            st.info(f"**Response:** {response_text}")
+                            placeholder.info(f"**Response:** {response_text}")
                             
                     except Exception as e:
                         st.error(f"❌ Error: {e}")
@@ -143,25 +194,10 @@ def main():
     with col2:
         st.header("📊 Quick Stats")
         
-        # Weather API status
-        try:
-            test_result = st.session_state.mcp_client.call_tool(
-                "get_weather_forecast", 
-                {"location": "London", "date": "today"}
-            )
-            st.success("✅ Weather API: Connected")
-        except:
-            st.error("❌ Weather API: Error")
-
-        # AI API status
-        try:
-            test_result = st.session_state.mcp_client.call_tool(
-                "extract_location_date", 
-                {"user_input": "What's the weather in Paris today?"}
-            )
-            st.success("✅ AI API: Connected")
-        except:
-            st.error("❌ AI API: Error")
+        # API status from the background probe; never blocks the page
+        health = st.session_state.mcp_client.health
+        show_api_status("Weather API", health.get(WEATHER_HOST))
+        show_api_status("AI API", health.get(AI_HOST))
 
         st.header("🎯 Features")
         st.markdown("""
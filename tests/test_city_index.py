@@ -0,0 +1,20 @@
+import pytest
+from tools.city_index import resolve_city
+from tools.weather import forecast_query
+
+# The hand-written CITY_FIXES table the gazetteer replaced
+CITY_FIXES = {
+    "karchi": "karachi-pk", "lahor": "lahore-pk", "islamabd": "islamabad-pk",
+    "madina": "medina-sa", "makah": "mecca-sa", "makka": "mecca-sa",
+    "makkah": "mecca-sa", "mecca": "mecca-sa"
+}
+
+@pytest.mark.parametrize("name,city_id", CITY_FIXES.items())
+def test_former_city_fixes_resolve_offline(name, city_id):
+    assert resolve_city(name).id == city_id
+    assert forecast_query(name)[0] == city_id
+    assert forecast_query(name.title())[0] == city_id
+
+@pytest.mark.parametrize("name", ["Kandy", "Bern", "Londonderry", "Sidney", "Parisville"])
+def test_unknown_cities_go_upstream_by_name(name):
+    assert forecast_query(name) == (name.lower(), {"q": name})
@@ -0,0 +1,37 @@
+import asyncio
+import pytest
+import mcp_client
+
+# Only the first launch to claim the marker serves; every other worker exits at once
+WORKER = """
+import json, os, sys
+try:
+    os.close(os.open(sys.argv[0] + ".serving", os.O_CREAT | os.O_EXCL))
+except FileExistsError:
+    sys.exit(1)
+for line in sys.stdin:
+    message = json.loads(line)
+    print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": {}}), flush=True)
+"""
+
+def test_failed_start_stops_the_workers_that_started(tmp_path, monkeypatch):
+    script = tmp_path / "worker.py"
+    script.write_text(WORKER)
+    monkeypatch.setattr(mcp_client, "SERVER_SCRIPT", str(script))
+    clients = []
+    start = mcp_client.MCPClient.start
+    async def tracked(client):
+        clients.append(client)
+        await start(client)
+    monkeypatch.setattr(mcp_client.MCPClient, "start", tracked)
+
+    async def run():
+        pool = mcp_client.MCPClientPool(size=3, timeout=5)
+        with pytest.raises(Exception, match="MCP server exited"):
+            await pool.start()
+        return pool
+
+    pool = asyncio.run(run())
+    assert len(clients) == 3
+    assert all(client.process.returncode is not None for client in clients)
+    assert pool.workers == []
@@ -0,0 +1,47 @@
+import asyncio
+import mcp_server
+
+WEATHER = {"date": "2026-10-19", "description": "Clear sky", "temperature": 20.0,
+           "temp_min": 18.0, "temp_max": 22.0, "precipitation_probability": 0.0}
+
+def test_streaming_follower_of_a_silent_leader_gets_tokens(monkeypatch):
+    server = mcp_server.WeatherMCPServer()
+
+    async def process_queries(user_inputs, on_token=None, mode=None, language=None):
+        await asyncio.sleep(0.01)
+        for text in ("Clear ", "sky."):
+            if on_token:
+                await on_token(text)
+        return [{"response": "Clear sky."}]
+    monkeypatch.setattr(server, "process_queries", process_queries)
+
+    async def run():
+        tokens = []
+        async def on_token(text):
+            tokens.append(text)
+        leader = asyncio.ensure_future(server.process_query("Weather in Rome tomorrow?"))
+        await asyncio.sleep(0)
+        follower = await server.process_query("Weather in Rome tomorrow?", on_token)
+        return await leader, follower, tokens
+
+    leader, follower, tokens = asyncio.run(run())
+    assert leader == follower == [{"response": "Clear sky."}]
+    assert server.query_flights.coalesced == 1
+    assert tokens == ["Clear ", "sky."]
+
+def test_auto_budget_still_bounds_a_caller_that_is_not_streaming(monkeypatch):
+    server = mcp_server.WeatherMCPServer()
+    server.response_budget = 0.05
+
+    async def generate(user_input, location, date, description, temperature, on_token=None):
+        if on_token:
+            await on_token("Slow ")
+        await asyncio.sleep(0.3)
+        return "Slow answer."
+    monkeypatch.setattr(mcp_server, "generate_weather_response_async", generate)
+
+    response = asyncio.run(server.answer(
+        "Weather in Rome tomorrow?", {"location": "Rome", "date": "tomorrow"}, WEATHER, "auto", "en"
+    ))
+    assert response != "Slow answer."
+    assert "Rome" in response
@@ -0,0 +1,39 @@
+import asyncio
+import datetime
+import threading
+import pytest
+from tools import date_resolver
+
+TODAY = datetime.date(2026, 10, 18)
+
+@pytest.fixture
+def dateparser_threads(monkeypatch):
+    threads = []
+    def parse(text):
+        threads.append(threading.current_thread())
+        return datetime.date(2026, 10, 20) if text == "october 20" else None
+    monkeypatch.setattr(date_resolver, "parse_with_dateparser", parse)
+    date_resolver._resolve.cache_clear()
+    date_resolver._resolve_range.cache_clear()
+    yield threads
+    date_resolver._resolve.cache_clear()
+    date_resolver._resolve_range.cache_clear()
+
+def test_fallback_runs_off_the_event_loop(dateparser_threads):
+    async def resolve():
+        return (await date_resolver.resolve_date_async("October 20", TODAY),
+                await date_resolver.resolve_range_async("today to October 20", TODAY))
+    date, span = asyncio.run(resolve())
+    assert date == datetime.date(2026, 10, 20)
+    assert span == (TODAY, datetime.date(2026, 10, 20))
+    assert dateparser_threads and threading.main_thread() not in dateparser_threads
+
+def test_fast_phrases_never_reach_the_fallback(dateparser_threads):
+    async def resolve():
+        return (await date_resolver.resolve_date_async("tomorrow", TODAY),
+                await date_resolver.resolve_range_async("this weekend", TODAY),
+                await date_resolver.resolve_range_async("tomorrow", TODAY))
+    assert asyncio.run(resolve()) == (
+        datetime.date(2026, 10, 19), (TODAY, TODAY), None
+    )
+    assert dateparser_threads == []
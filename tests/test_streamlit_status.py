@@ -0,0 +1,16 @@
+import pytest
+from streamlit_app import upstream_failing
+
+def outcome(status=None, error=None):
+    return {"requests": 1, "last_status": status, "last_error": error or (f"HTTP {status}" if status and status >= 400 else None)}
+
+@pytest.mark.parametrize("stats,failing", [
+    (outcome(200), False),
+    (outcome(404), False),
+    (outcome(400), False),
+    (outcome(429), True),
+    (outcome(503), True),
+    (outcome(error="ConnectTimeout"), True),
+])
+def test_only_unreachable_or_failing_upstreams_count(stats, failing):
+    assert upstream_failing(stats) is failing
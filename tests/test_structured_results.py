@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+import mcp_server
+
+jsonschema = pytest.importorskip("jsonschema")
+
+FORECAST = {"date": "2026-10-19", "description": "Clear sky", "temperature": 20.0,
+            "temp_min": 18.0, "temp_max": 22.0, "precipitation_probability": 0.0}
+
+def call(name, arguments):
+    async def run():
+        server = mcp_server.WeatherMCPServer()
+        await server.initialize({})
+        tools = {tool["name"]: tool for tool in await server.list_tools()}
+        return tools[name]["outputSchema"], await server.call_tool(name, arguments)
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("forecast", [FORECAST, None])
+def test_forecast_results_match_the_schema(monkeypatch, forecast):
+    async def get_weather_forecast_async(location, date, hour=None):
+        return forecast
+    monkeypatch.setattr(mcp_server, "get_weather_forecast_async", get_weather_forecast_async)
+
+    schema, result = call("get_weather_forecast", {"location": "Rome", "date": "tomorrow"})
+    jsonschema.validate(result["structuredContent"], schema)
+    assert result["isError"] is (forecast is None)
+
+def test_extraction_errors_match_the_schema(monkeypatch):
+    async def extract_query_async(user_input):
+        return None
+    monkeypatch.setattr(mcp_server, "extract_query_async", extract_query_async)
+
+    schema, result = call("extract_location_date", {"user_input": "hello"})
+    jsonschema.validate(result["structuredContent"], schema)
+    assert result["isError"]
+    assert result["structuredContent"]["error"] == result["content"][0]["text"]
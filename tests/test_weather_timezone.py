@@ -0,0 +1,56 @@
+import asyncio
+import calendar
+import datetime
+import pytest
+from tools import weather
+from tools.forecast_index import build_forecast_index
+
+def payload(start, timezone):
+    return {
+        "city": {"name": "Test", "timezone": timezone},
+        "list": [
+            {"dt": start + i * 10800, "main": {"temp": 20 + i % 8},
+             "weather": [{"main": "Clouds", "description": "few clouds"}], "pop": 0.1}
+            for i in range(40)
+        ]
+    }
+
+def utc(*args):
+    return calendar.timegm(datetime.datetime(*args).timetuple())
+
+@pytest.fixture
+def city(monkeypatch):
+    def use(now, timezone):
+        index = build_forecast_index(payload(now - now % 10800, timezone))
+        monkeypatch.setattr(weather.time, "time", lambda: now)
+
+        async def get_forecast_index(location):
+            return index
+
+        monkeypatch.setattr(weather, "get_forecast_index", get_forecast_index)
+        return index
+    return use
+
+def test_today_is_the_city_local_day_east_of_utc(city):
+    # 21:00 UTC on the 18th is already 06:00 on the 19th in Tokyo
+    index = city(utc(2026, 10, 18, 21), 9 * 3600)
+    assert index.local_today() == datetime.date(2026, 10, 19)
+    result = asyncio.run(weather.get_weather_forecast_async("Tokyo", "today"))
+    assert result["date"] == "2026-10-19"
+
+def test_tomorrow_is_the_city_local_day_west_of_utc(city):
+    # 02:00 UTC on the 19th is still the evening of the 18th in New York
+    city(utc(2026, 10, 19, 2), -4 * 3600)
+    result = asyncio.run(weather.get_weather_forecast_async("New York", "tomorrow"))
+    assert result["date"] == "2026-10-19"
+
+def test_horizon_follows_the_city_local_day(city):
+    city(utc(2026, 10, 18, 21), 9 * 3600)
+    results = asyncio.run(weather.get_weather_forecasts_async([
+        {"location": "Tokyo", "date": "in 4 days"},
+        {"location": "Tokyo", "date": "in 5 days"},
+        {"location": "Tokyo", "date": "next 3 days", "span": True, "hourly": False},
+    ]))
+    assert results[0]["result"]["date"] == "2026-10-23"
+    assert "error" in results[1]
+    assert (results[2]["result"]["start"], results[2]["result"]["end"]) == ("2026-10-19", "2026-10-21")
@@ -0,0 +1,148 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+class TTLCache:
+    # store is an optional DiskCache shared with other processes; encode/decode turn
+    # values into bytes and back, and values are written through under namespace
+    def __init__(self, max_entries=256, max_bytes=None, store=None, namespace=None, encode=None, decode=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+        self.namespace = namespace
+        self.encode = encode
+        self.decode = decode
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl, size=1):
+        if key in self._entries:
+            self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if key in self._entries:
+            self._remove(key)
+        if self.store is not None:
+            self._offload(self.store.invalidate, self.namespace, key)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+        if self.store is not None:
+            self._offload(self.store.clear, self.namespace)
+
+    def _offload(self, call, *args):
+        # Disk deletes may wait on a sibling's write lock; never on the event loop
+        try:
+            asyncio.get_running_loop().run_in_executor(None, call, *args)
+        except RuntimeError:
+            call(*args)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+    # Concurrent misses for the same key share one fetch(); None results are not cached.
+    # ttl is seconds, or a callable taking the fetched value.
+    async def get_or_fetch(self, key, fetch, ttl, sizeof=None):
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._fill(key, fetch, ttl, sizeof))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    # Fetches even when a fresh value is cached (prefetching); shares any fetch already in flight
+    async def refresh(self, key, fetch, ttl, sizeof=None):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, fetch, ttl, sizeof))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def expires_in(self, key):
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0] - time.monotonic()
+
+    async def _fill(self, key, fetch, ttl, sizeof):
+        # A sibling process may already have paid for this value
+        value = await self._load(key, sizeof)
+        if value is not None:
+            return value
+        return await self._fetch(key, fetch, ttl, sizeof)
+
+    async def _fetch(self, key, fetch, ttl, sizeof):
+        value = await fetch()
+        if value is not None:
+            seconds = ttl(value) if callable(ttl) else ttl
+            if seconds > 0:
+                self.set(key, value, seconds, sizeof(value) if sizeof else 1)
+                if self.store is not None:
+                    await asyncio.to_thread(self.store.set, self.namespace, key, self.encode(value), seconds)
+        return value
+
+    async def _load(self, key, sizeof):
+        if self.store is None:
+            return None
+        found = await asyncio.to_thread(self.store.get, self.namespace, key)
+        if found is None:
+            return None
+        data, expires_at = found
+        try:
+            value = self.decode(data)
+        except Exception:
+            self._offload(self.store.invalidate, self.namespace, key)
+            return None
+        self.disk_hits += 1
+        self.set(key, value, expires_at - time.time(), sizeof(value) if sizeof else 1)
+        return value
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "disk_hits": self.disk_hits,
+            "inflight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0
+        }
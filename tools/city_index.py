@@ -0,0 +1,159 @@
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+
+CITIES_FILE = os.path.join(os.path.dirname(__file__), "data", "cities.tsv")
+
+# A misspelling is only resolved when it is very close to one known city and clearly
+# closer than the runner-up; anything else is sent upstream as typed, since a real
+# city missing from the gazetteer ("Bern", "Kandy") must not become a neighbour of it
+FUZZY_MIN_SCORE = float(os.getenv("CITY_FUZZY_MIN_SCORE", "0.8"))
+FUZZY_MIN_MARGIN = float(os.getenv("CITY_FUZZY_MIN_MARGIN", "0.2"))
+
+NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+QUALIFIER_RE = re.compile(r"^(.*?),\s*([A-Za-z]{2})$")
+
+class City:
+    __slots__ = ("id", "name", "country", "lat", "lon", "population")
+
+    def __init__(self, id, name, country, lat, lon, population):
+        self.id = id
+        self.name = name
+        self.country = country
+        self.lat = lat
+        self.lon = lon
+        self.population = population
+
+    @property
+    def label(self):
+        return f"{self.name}, {self.country}"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "country": self.country,
+            "lat": self.lat,
+            "lon": self.lon
+        }
+
+def normalize_name(text):
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(NON_WORD_RE.sub(" ", text.lower()).split())
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class CityIndex:
+    def __init__(self, cities):
+        self.cities = {city.id: city for city in cities}
+        self.names = {}  # normalized name or alias -> cities, most populous first
+        for city, keys in cities.items():
+            for key in keys:
+                self.names.setdefault(key, []).append(city)
+        for matches in self.names.values():
+            matches.sort(key=lambda city: -city.population)
+
+        # Sorted keys stand in for a prefix trie; trigram postings catch typos
+        self.keys = sorted(self.names)
+        self.grams = {}
+        self.gram_counts = {}
+        for key in self.keys:
+            grams = trigrams(key)
+            self.gram_counts[key] = len(grams)
+            for gram in grams:
+                self.grams.setdefault(gram, []).append(key)
+
+    def prefixed(self, key):
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i].startswith(key):
+            yield self.keys[i]
+            i += 1
+
+    def similar(self, key):
+        grams = trigrams(key)
+        shared = {}
+        for gram in grams:
+            for candidate in self.grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        for candidate, common in shared.items():
+            yield candidate, 2 * common / (len(grams) + self.gram_counts[candidate])
+
+    def candidates(self, query, limit=5):
+        country = None
+        match = QUALIFIER_RE.match(query.strip())
+        if match:
+            query, country = match.group(1), match.group(2).upper()
+        key = normalize_name(query)
+        if not key:
+            return []
+
+        scores = {}
+
+        def offer(name, score):
+            for city in self.names[name]:
+                if country and city.country != country:
+                    continue
+                if score > scores.get(city, 0):
+                    scores[city] = score
+
+        if key in self.names:
+            offer(key, 1.0)
+        for name in self.prefixed(key):
+            if name != key:
+                offer(name, 0.9 * len(key) / len(name))
+        for name, score in self.similar(key):
+            offer(name, score)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0].population))
+        return ranked[:limit]
+
+    def resolve(self, query, min_score=FUZZY_MIN_SCORE, min_margin=FUZZY_MIN_MARGIN):
+        city = self.cities.get(query)
+        if city is not None:
+            return city
+        exact = self.names.get(normalize_name(query))
+        if exact:
+            return exact[0]
+        ranked = self.candidates(query, limit=2)
+        if not ranked or ranked[0][1] < min_score:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < min_margin:
+            return None
+        return ranked[0][0]
+
+def load_cities(path=CITIES_FILE):
+    cities = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            id, name, country, lat, lon, population, aliases = line.rstrip("\n").split("\t")
+            city = City(id, name, country, float(lat), float(lon), int(population))
+            keys = {normalize_name(name)}
+            keys.update(normalize_name(alias) for alias in aliases.split(";") if alias.strip())
+            cities[city] = keys
+    return cities
+
+_index = None
+
+def get_city_index():
+    # Built on first use so importing the tools stays cheap
+    global _index
+    if _index is None:
+        _index = CityIndex(load_cities())
+    return _index
+
+def resolve_city(name, min_score=FUZZY_MIN_SCORE, min_margin=FUZZY_MIN_MARGIN):
+    return get_city_index().resolve(name, min_score, min_margin)
+
+def find_city_candidates(name, limit=5):
+    return [{**city.to_dict(), "score": round(score, 3)}
+            for city, score in get_city_index().candidates(name, limit)]
+
+def city_names():
+    # Every known name and alias mapped to the canonical name of its most populous city
+    return {key: cities[0].name for key, cities in get_city_index().names.items()}
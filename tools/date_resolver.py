@@ -0,0 +1,158 @@
+import re
+import asyncio
+import datetime
+from functools import lru_cache
+
+DAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+        'friday': 4, 'saturday': 5, 'sunday': 6}
+
+WEEKDAY_RE = re.compile(r"(?:on |this |next |coming )?(" + "|".join(DAYS) + r")")
+IN_DAYS_RE = re.compile(r"in (\d+) days?")
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+OFFSETS = {
+    "today": 0, "tonight": 0, "now": 0, "currently": 0, "right now": 0,
+    "this morning": 0, "this afternoon": 0, "this evening": 0,
+    "tomorrow": 1, "tomorrow morning": 1, "tomorrow afternoon": 1, "tomorrow evening": 1,
+    "day after tomorrow": 2, "the day after tomorrow": 2,
+    "yesterday": -1
+}
+WEEKEND = {"weekend", "this weekend", "the weekend", "on the weekend", "at the weekend"}
+WEEK = {"this week", "the week", "rest of the week", "the rest of the week"}
+
+NUMBERS = {"two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "few": 3}
+NEXT_DAYS_RE = re.compile(r"(?:for |over )?(?:the )?(?:next|coming) (\d+|" + "|".join(NUMBERS) + r") days")
+SPAN_RE = re.compile(r"(?:from )?(.+?) (?:to|through|thru|until|till|-) (.+)")
+BETWEEN_RE = re.compile(r"between (.+?) and (.+)")
+
+# Far beyond any forecast, yet safely inside datetime's range: huge "in N days" gets
+# the horizon message instead of an OverflowError
+MAX_DAYS_AHEAD = 366
+
+def days_ahead(today, count):
+    return today + datetime.timedelta(days=min(count, MAX_DAYS_AHEAD))
+
+def next_weekday(weekday, today):
+    days_ahead = weekday - today.weekday()
+    if days_ahead <= 0:
+        days_ahead += 7
+    return today + datetime.timedelta(days=days_ahead)
+
+def get_next_weekday(day_name, today=None):
+    day_name = day_name.lower()
+    if day_name not in DAYS:
+        return None
+    return next_weekday(DAYS[day_name], today or datetime.date.today())
+
+def resolve_common(text, today):
+    if text in OFFSETS:
+        return today + datetime.timedelta(days=OFFSETS[text])
+    if text in WEEKEND:
+        return weekend(today)[0]
+    match = WEEKDAY_RE.fullmatch(text)
+    if match:
+        return next_weekday(DAYS[match.group(1)], today)
+    match = IN_DAYS_RE.fullmatch(text)
+    if match:
+        return days_ahead(today, int(match.group(1)))
+    if ISO_DATE_RE.fullmatch(text):
+        try:
+            return datetime.date.fromisoformat(text)
+        except ValueError:
+            return None
+    return None
+
+def weekend(today):
+    # Already the weekend: today counts; otherwise the coming Saturday
+    start = today if today.weekday() >= 5 else next_weekday(5, today)
+    return start, start + datetime.timedelta(days=6 - start.weekday())
+
+def range_common(text, today, resolve):
+    if text in WEEKEND:
+        return weekend(today)
+    if text in WEEK:
+        return today, today + datetime.timedelta(days=6 - today.weekday())
+    match = NEXT_DAYS_RE.fullmatch(text)
+    if match:
+        count = NUMBERS.get(match.group(1)) or int(match.group(1))
+        return today, days_ahead(today, max(count, 1) - 1)
+    match = SPAN_RE.fullmatch(text) or BETWEEN_RE.fullmatch(text)
+    if not match:
+        return None
+    start = resolve(match.group(1), today)
+    if start is None:
+        return None
+    end_text = match.group(2)
+    if end_text in DAYS:
+        # "Monday to Wednesday": the end is the first such weekday from the start on
+        end = start + datetime.timedelta(days=(DAYS[end_text] - start.weekday()) % 7)
+    else:
+        end = resolve(end_text, today)
+    if end is None or end < start:
+        return None
+    return start, end
+
+def parse_with_dateparser(text):
+    # Heavy: the import takes ~0.5s and the first parse a few seconds more, so async
+    # callers only ever reach it through a worker thread
+    import dateparser
+    parsed = dateparser.parse(text)
+    return parsed.date() if parsed else None
+
+# Keyed on the calendar day too, so relative answers roll over at midnight
+@lru_cache(maxsize=1024)
+def _resolve(text, today):
+    date = resolve_common(text, today)
+    if date is None:
+        # A span asked of a single-date lookup answers for its first day
+        span = _resolve_range(text, today)
+        date = span[0] if span else parse_with_dateparser(text)
+    return date
+
+@lru_cache(maxsize=1024)
+def _resolve_range(text, today):
+    return range_common(text, today, _resolve)
+
+# Everything but the dateparser fallback
+def _resolve_fast(text, today):
+    date = resolve_common(text, today)
+    if date is None:
+        span = range_common(text, today, _resolve_fast)
+        date = span[0] if span else None
+    return date
+
+def resolve_date(date_text, today=None):
+    text = " ".join(date_text.lower().split())
+    if not text:
+        return None
+    return _resolve(text, today or datetime.date.today())
+
+# (first, last) day for span phrases like "this weekend", "next 3 days" or
+# "Monday to Wednesday"; None when the text names a single day
+def resolve_range(date_text, today=None):
+    text = " ".join(date_text.lower().split())
+    if not text:
+        return None
+    return _resolve_range(text, today or datetime.date.today())
+
+# The async callers resolve what the fast path covers inline and hand the rest to a
+# thread; either way the answer lands in the caches the sync lookups read
+async def resolve_date_async(date_text, today=None):
+    text = " ".join(date_text.lower().split())
+    if not text:
+        return None
+    today = today or datetime.date.today()
+    date = _resolve_fast(text, today)
+    if date is None:
+        date = await asyncio.to_thread(_resolve, text, today)
+    return date
+
+async def resolve_range_async(date_text, today=None):
+    text = " ".join(date_text.lower().split())
+    if not text:
+        return None
+    today = today or datetime.date.today()
+    span = range_common(text, today, _resolve_fast)
+    if span is None and (SPAN_RE.fullmatch(text) or BETWEEN_RE.fullmatch(text)):
+        span = await asyncio.to_thread(_resolve_range, text, today)
+    return span
@@ -0,0 +1,131 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PERSISTENT_CACHE_PATH = os.getenv("PERSISTENT_CACHE_PATH", "")
+PERSISTENT_CACHE_MAX_BYTES = int(os.getenv("PERSISTENT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# How many writes go by between size checks
+EVICT_EVERY = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at);
+"""
+
+# SQLite in WAL mode: any number of server processes read while one writes.
+# Expiry uses wall-clock time so entries stay valid across restarts. get/set may wait
+# on a sibling's write lock, so async callers run them in a worker thread.
+class DiskCache:
+    def __init__(self, path, max_bytes=PERSISTENT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def get(self, namespace, key):
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️ Persistent cache read failed: {e}", file=sys.stderr)
+            return None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bytes(row[0]), row[1]
+
+    def set(self, namespace, key, value, ttl):
+        try:
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                    (namespace, key, value, time.time() + ttl, len(value))
+                )
+                self.writes += 1
+                if self.writes % EVICT_EVERY == 0:
+                    self.evict()
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️ Persistent cache write failed: {e}", file=sys.stderr)
+
+    def evict(self):
+        self.conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        # Entries closest to expiry go first; reads never write, so there is no LRU order to follow
+        for entry_namespace, key, size in self.conn.execute(
+                "SELECT namespace, key, size FROM entries ORDER BY expires_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (entry_namespace, key))
+            total -= size
+            self.evictions += 1
+
+    def invalidate(self, namespace, key):
+        self.delete("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace):
+        self.delete("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def delete(self, sql, args):
+        try:
+            with self.lock:
+                self.conn.execute(sql, args)
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️ Persistent cache delete failed: {e}", file=sys.stderr)
+
+    def stats(self):
+        with self.lock:
+            entries, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE expires_at > ?", (time.time(),)
+            ).fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors
+        }
+
+def open_store(path=PERSISTENT_CACHE_PATH):
+    if not path:
+        return None
+    try:
+        return DiskCache(path)
+    except sqlite3.Error as e:
+        print(f"⚠️ Persistent cache disabled ({path}): {e}", file=sys.stderr)
+        return None
+
+store = open_store()
+
+def get_disk_cache_stats():
+    return store.stats() if store is not None else None
@@ -0,0 +1,168 @@
+import os
+import re
+import datetime
+from tools.date_resolver import DAYS, NUMBERS, days_ahead, get_next_weekday, resolve_date, resolve_range
+from tools.city_index import city_names, resolve_city
+from tools.llm_extractor import extract_location_date_async
+
+MIN_CONFIDENCE = float(os.getenv("FAST_EXTRACT_MIN_CONFIDENCE", "0.8"))
+MAX_CITY_WORDS = 4
+# Misspelled names are only trusted right after a preposition, and with a stricter score
+FUZZY_CITY_WORDS = 2
+FUZZY_MIN_SCORE = 0.6
+MIN_FUZZY_LENGTH = 4
+
+WORD_RE = re.compile(r"[a-z]+(?:['’][a-z]+)?")
+PREPOSITIONS = {"in", "at", "for", "of", "near", "around"}
+
+DAY_WORDS = "today|tomorrow|" + "|".join(DAYS)
+
+DATE_PATTERNS = [
+    # Spans first, so their endpoints are not read as competing single dates
+    (re.compile(r"\b(?:the )?(?:next|coming) (?:\d+|" + "|".join(NUMBERS) + r") days\b"), "range", None),
+    (re.compile(r"\b(?:this|the rest of the|rest of the) week\b"), "range", None),
+    (re.compile(r"\b(?:from )?(?:" + DAY_WORDS + r") (?:to|through|thru|until|till|-) (?:" + DAY_WORDS + r")\b"), "range", None),
+    (re.compile(r"\bbetween (?:" + DAY_WORDS + r") and (?:" + DAY_WORDS + r")\b"), "range", None),
+    (re.compile(r"\bday after tomorrow\b"), "offset", 2),
+    (re.compile(r"\b(?:today|tonight|now|currently|right now|this (?:morning|afternoon|evening))\b"), "offset", 0),
+    (re.compile(r"\btomorrow\b"), "offset", 1),
+    (re.compile(r"\bin (\d+) days?\b"), "in_days", None),
+    (re.compile(r"\b(\d{4}-\d{2}-\d{2})\b"), "iso", None),
+    (re.compile(r"\b(?:on |this |next |coming )?(" + "|".join(DAYS) + r")\b"), "weekday", None),
+    (re.compile(r"\b(?:this |the |on the |at the )?weekend\b"), "weekend", None),
+]
+
+# Time words no pattern above understands; a question containing one is not about
+# "today" and is left to the LLM rather than defaulted
+OTHER_TIME_RE = re.compile(
+    r"\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+    r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?|"
+    r"yesterday|week|weeks|fortnight|month|months|year|years|ago|last|later|\d+(?:st|nd|rd|th)?)\b"
+)
+
+stats = {"fast_path": 0, "fallback": 0}
+
+_gazetteer = None
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = city_names()
+    return _gazetteer
+
+def find_cities(user_input):
+    gazetteer = get_gazetteer()
+    words = [(m.group(0), m.start()) for m in WORD_RE.finditer(user_input.lower())]
+    found = []
+    i = 0
+    while i < len(words):
+        for size in range(min(MAX_CITY_WORDS, len(words) - i), 0, -1):
+            phrase = " ".join(word for word, _ in words[i:i + size])
+            city = gazetteer.get(phrase)
+            if city is None:
+                continue
+            start = words[i][1]
+            if i > 0 and words[i - 1][0] in PREPOSITIONS:
+                strength = 0.6
+            elif user_input[start].isupper():
+                strength = 0.5
+            else:
+                strength = 0.3
+            found.append((city, strength))
+            i += size - 1
+            break
+        else:
+            if i > 0 and words[i - 1][0] in PREPOSITIONS:
+                i += find_misspelled_city(words, i, found)
+        i += 1
+    return found
+
+def find_misspelled_city(words, i, found):
+    for size in range(min(FUZZY_CITY_WORDS, len(words) - i), 0, -1):
+        phrase = " ".join(word for word, _ in words[i:i + size])
+        if len(phrase) < MIN_FUZZY_LENGTH:
+            continue
+        city = resolve_city(phrase, FUZZY_MIN_SCORE)
+        if city is not None:
+            found.append((city.name, 0.5))
+            return size - 1
+    return 0
+
+def find_dates(text, today):
+    found = []
+    for pattern, kind, value in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            if kind == "range":
+                label = match.group(0)
+                span = resolve_range(label, today)
+                if span is None:
+                    continue
+                resolved = span[0]
+            elif kind == "offset":
+                resolved = today + datetime.timedelta(days=value)
+                label = {0: "today", 1: "tomorrow"}.get(value, resolved.isoformat())
+            elif kind == "in_days":
+                resolved = days_ahead(today, int(match.group(1)))
+                label = resolved.isoformat()
+            elif kind == "iso":
+                try:
+                    resolved = datetime.date.fromisoformat(match.group(1))
+                except ValueError:
+                    continue
+                label = resolved.isoformat()
+            elif kind == "weekend":
+                resolved = resolve_date("this weekend", today)
+                label = "this weekend"
+            else:
+                resolved = get_next_weekday(match.group(1), today)
+                label = match.group(1).capitalize()
+            found.append((label, resolved))
+        # "day after tomorrow" must not also count as "tomorrow"
+        text = pattern.sub(" ", text)
+    return found
+
+def fast_extract(user_input, today=None):
+    today = today or datetime.date.today()
+
+    cities = find_cities(user_input)
+    if not cities:
+        return None
+    city, confidence = max(cities, key=lambda c: c[1])
+    # Lowercase gazetteer hits like "nice" only count when nothing better was found
+    if confidence > 0.3:
+        cities = [c for c in cities if c[1] > 0.3]
+    if len({c for c, _ in cities}) > 1:
+        confidence -= 0.3
+
+    dates = find_dates(user_input.lower(), today)
+    if dates:
+        label, resolved = dates[0]
+        confidence += 0.4
+        if len({d for _, d in dates}) > 1:
+            confidence -= 0.3
+    else:
+        label, resolved = "today", today
+        if not OTHER_TIME_RE.search(user_input.lower()):
+            confidence += 0.2
+
+    return {
+        "location": city,
+        "date": label,
+        "resolved_date": resolved.isoformat(),
+        "confidence": round(max(confidence, 0.0), 2)
+    }
+
+async def extract_query_async(user_input):
+    extracted = fast_extract(user_input)
+    if extracted and extracted["confidence"] >= MIN_CONFIDENCE:
+        stats["fast_path"] += 1
+        return extracted
+    stats["fallback"] += 1
+    return await extract_location_date_async(user_input)
+
+def get_extractor_stats():
+    total = stats["fast_path"] + stats["fallback"]
+    return {
+        **stats,
+        "fast_path_rate": round(stats["fast_path"] / total, 4) if total else 0.0
+    }
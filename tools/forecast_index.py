@@ -0,0 +1,149 @@
+import time
+import datetime
+from collections import Counter
+
+SLOT_HOURS = 3
+SLOTS_PER_DAY = 24 // SLOT_HOURS
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+class ForecastSlot:
+    __slots__ = ("dt", "hour", "temperature", "condition", "description", "pop")
+
+    def __init__(self, dt, hour, temperature, condition, description, pop):
+        self.dt = dt
+        self.hour = hour
+        self.temperature = temperature
+        self.condition = condition
+        self.description = description
+        self.pop = pop
+
+    def to_dict(self):
+        return {
+            "hour": self.hour,
+            "description": self.description,
+            "temperature": self.temperature,
+            "precipitation_probability": self.pop
+        }
+
+class DailyForecast:
+    __slots__ = ("date", "slots", "temp_min", "temp_max", "temp_mean",
+                 "condition", "description", "pop")
+
+    def __init__(self, date, entries):
+        self.date = date
+        # Fixed 3-hour buckets so a time-of-day lookup is a single index
+        self.slots = [None] * SLOTS_PER_DAY
+        for slot in entries:
+            self.slots[slot.hour // SLOT_HOURS] = slot
+
+        temps = [slot.temperature for slot in entries]
+        self.temp_min = min(temps)
+        self.temp_max = max(temps)
+        self.temp_mean = round(sum(temps) / len(temps), 1)
+        self.pop = max(slot.pop for slot in entries)
+
+        self.condition = Counter(slot.condition for slot in entries).most_common(1)[0][0]
+        self.description = Counter(
+            slot.description for slot in entries if slot.condition == self.condition
+        ).most_common(1)[0][0]
+
+    def slot_at(self, hour):
+        index = min(max(hour, 0), 23) // SLOT_HOURS
+        slot = self.slots[index]
+        if slot is not None:
+            return slot
+        # Today's early slots are gone from the payload; fall back to the closest one left
+        for distance in range(1, SLOTS_PER_DAY):
+            for candidate in (index + distance, index - distance):
+                if 0 <= candidate < SLOTS_PER_DAY and self.slots[candidate] is not None:
+                    return self.slots[candidate]
+        return None
+
+    def hourly(self):
+        return [slot for slot in self.slots if slot is not None]
+
+    def to_dict(self):
+        return {
+            "date": self.date.isoformat(),
+            "description": self.description,
+            "temperature": self.temp_mean,
+            "temp_min": self.temp_min,
+            "temp_max": self.temp_max,
+            "precipitation_probability": self.pop
+        }
+
+class ForecastIndex:
+    __slots__ = ("city", "timezone", "days", "size")
+
+    def __init__(self, city, timezone, days, size):
+        self.city = city
+        self.timezone = timezone
+        self.days = days
+        self.size = size
+
+    def day(self, date):
+        return self.days.get(date)
+
+    # Days are keyed by the city's calendar, so "today" must be the city's today too
+    def local_today(self, now=None):
+        now = time.time() if now is None else now
+        return datetime.date.fromordinal(EPOCH_ORDINAL + int(now + self.timezone) // 86400)
+
+    def dates(self):
+        return sorted(self.days)
+
+    def span(self, start, end):
+        return [self.days[date] for date in self.dates() if start <= date <= end]
+
+    # Trimmed OpenWeather-shaped payload; build_forecast_index() turns it back into an index
+    def to_payload(self):
+        return {
+            "city": {"name": self.city, "timezone": self.timezone},
+            "list": [
+                {"dt": slot.dt, "main": {"temp": slot.temperature},
+                 "weather": [{"main": slot.condition, "description": slot.description}], "pop": slot.pop}
+                for date in self.dates() for slot in self.days[date].hourly()
+            ]
+        }
+
+# Aggregates over several days: the condition seen in most slots, extremes across all of them
+def summarize_days(days):
+    slots = [slot for day in days for slot in day.hourly()]
+    condition = Counter(slot.condition for slot in slots).most_common(1)[0][0]
+    description = Counter(
+        slot.description for slot in slots if slot.condition == condition
+    ).most_common(1)[0][0]
+    return {
+        "description": description,
+        "temperature": round(sum(day.temp_mean for day in days) / len(days), 1),
+        "temp_min": min(day.temp_min for day in days),
+        "temp_max": max(day.temp_max for day in days),
+        "precipitation_probability": max(day.pop for day in days)
+    }
+
+def build_forecast_index(data):
+    city = data.get("city", {})
+    timezone = city.get("timezone", 0)
+
+    by_day = {}
+    for entry in data.get("list", []):
+        # Local time from the epoch int and the city's UTC offset; no dt_txt parsing
+        local = entry["dt"] + timezone
+        day_number, seconds = divmod(local, 86400)
+        weather = entry["weather"][0] if entry.get("weather") else {}
+        slot = ForecastSlot(
+            entry["dt"],
+            seconds // 3600,
+            entry["main"]["temp"],
+            weather.get("main", ""),
+            weather.get("description", "").capitalize(),
+            entry.get("pop", 0)
+        )
+        by_day.setdefault(day_number, []).append(slot)
+
+    days = {}
+    for day_number, entries in by_day.items():
+        date = datetime.date.fromordinal(EPOCH_ORDINAL + day_number)
+        days[date] = DailyForecast(date, entries)
+    size = 256 + len(days) * 256 + sum(len(entries) for entries in by_day.values()) * 128
+    return ForecastIndex(city.get("name"), timezone, days, size)
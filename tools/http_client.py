@@ -0,0 +1,107 @@
+import os
+import time
+import asyncio
+import weakref
+import httpx
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from tools import metrics
+
+load_dotenv()
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+
+# Per-host outcome counters, so health can be read without probing upstream
+upstream_stats = {}
+
+def host_stats(host):
+    stats = upstream_stats.get(host)
+    if stats is None:
+        stats = upstream_stats[host] = {
+            "requests": 0, "errors": 0, "last_status": None, "last_error": None,
+            "last_ok_at": None, "last_error_at": None
+        }
+    return stats
+
+def record_outcome(host, status=None, error=None):
+    stats = host_stats(host)
+    stats["requests"] += 1
+    stats["last_status"] = status
+    if error is None and status is not None and status < 400:
+        stats["last_ok_at"] = time.time()
+        stats["last_error"] = None
+    else:
+        stats["errors"] += 1
+        stats["last_error"] = error or f"HTTP {status}"
+        stats["last_error_at"] = time.time()
+
+async def on_response(response):
+    host = response.request.url.host
+    record_outcome(host, response.status_code)
+    if response.status_code == 429:
+        metrics.incr(f"upstream.{host}.429")
+
+def get_upstream_stats():
+    return {host: dict(stats) for host, stats in upstream_stats.items()}
+
+# One pooled client per event loop; httpx keeps a keep-alive pool per origin
+_clients = weakref.WeakKeyDictionary()
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            event_hooks={"response": [on_response]}
+        )
+        _clients[loop] = client
+    return client
+
+async def request(method, url, **kwargs):
+    host = httpx.URL(url).host
+    try:
+        with metrics.span("upstream." + host):
+            return await get_client().request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        record_outcome(host, error=type(e).__name__)
+        raise
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
+
+@asynccontextmanager
+async def stream(method, url, **kwargs):
+    host = httpx.URL(url).host
+    try:
+        with metrics.span("upstream." + host):
+            async with get_client().stream(method, url, **kwargs) as response:
+                yield response
+    except httpx.HTTPError as e:
+        record_outcome(host, error=type(e).__name__)
+        raise
+
+async def aclose():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def run_sync(coro):
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await aclose()
+    return asyncio.run(runner())
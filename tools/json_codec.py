@@ -0,0 +1,26 @@
+import os
+import json
+
+# orjson when installed (several times faster, returns bytes); JSON_CODEC=json forces the stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None and os.getenv("JSON_CODEC", "auto") != "json":
+    NAME = "orjson"
+
+    def dumps(obj):
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+else:
+    NAME = "json"
+
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+def dumps_text(obj):
+    return dumps(obj).decode()
@@ -1,14 +1,84 @@
 import os
-import requests
-import time
+import sys
+import re
+import datetime
 from dotenv import load_dotenv
+from tools import http_client, json_codec, resilience, disk_cache, together_scheduler
+from tools.cache import TTLCache
 
 load_dotenv()
 
-def extract_location_date(user_prompt):
+CHAT_COMPLETIONS_URL = os.getenv("TOGETHER_BASE_URL", "https://api.together.xyz").rstrip("/") + "/v1/chat/completions"
+
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", str(24 * 60 * 60)))
+
+extraction_cache = TTLCache(
+    max_entries=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "2048")),
+    store=disk_cache.store,
+    namespace="extraction",
+    encode=json_codec.dumps,
+    decode=json_codec.loads
+)
+
+JSON_OBJECT_RE = re.compile(r"\{[^{}]*\}", re.DOTALL)
+PUNCTUATION_RE = re.compile(r"[^\w\s-]")
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def normalize_prompt(user_prompt):
+    return " ".join(PUNCTUATION_RE.sub(" ", user_prompt.lower()).split())
+
+def as_extraction(extracted):
+    if isinstance(extracted, dict) and extracted.get("location") and extracted.get("date"):
+        return {"location": str(extracted["location"]), "date": str(extracted["date"])}
+    return None
+
+def parse_extraction(content):
+    # Models usually answer with the bare object; only fall back to scanning prose for it
+    try:
+        return as_extraction(json_codec.loads(content))
+    except (TypeError, ValueError):
+        pass
+    for match in JSON_OBJECT_RE.finditer(content or ""):
+        try:
+            extracted = as_extraction(json_codec.loads(match.group(0)))
+        except ValueError:
+            continue
+        if extracted:
+            return extracted
+    return None
+
+def seconds_until_midnight():
+    now = datetime.datetime.now()
+    midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return (midnight - now).total_seconds()
+
+def extraction_ttl(user_prompt, extracted):
+    # Only an absolute date quoted by the user stays valid past today
+    date = extracted["date"]
+    if ISO_DATE_RE.fullmatch(date) and date in user_prompt:
+        return EXTRACTION_CACHE_TTL
+    return min(EXTRACTION_CACHE_TTL, seconds_until_midnight())
+
+def get_extraction_cache_stats():
+    return extraction_cache.stats()
+
+async def extract_location_date_async(user_prompt):
+    async def fetch():
+        extracted = parse_extraction(await request_extraction(user_prompt))
+        if not extracted:
+            print("❌ Could not parse extracted data.", file=sys.stderr)
+        return extracted
+
+    return await extraction_cache.get_or_fetch(
+        normalize_prompt(user_prompt),
+        fetch,
+        lambda extracted: extraction_ttl(user_prompt, extracted)
+    )
+
+async def request_extraction(user_prompt):
     api_key = os.getenv("TOGETHER_API_KEY")
     if not api_key:
-        print("❌ TOGETHER_API_KEY not found.")
+        print("❌ TOGETHER_API_KEY not found.", file=sys.stderr)
         return None
 
     prompt = f"""
@@ -21,6 +91,8 @@ Examples:
   -> {{ "location": "Lahore", "date": "today" }}
 - User: Will it rain in Islamabad on Friday?
   -> {{ "location": "Islamabad", "date": "Friday" }}
+- User: How will the weather be in Karachi from Monday to Wednesday?
+  -> {{ "location": "Karachi", "date": "Monday to Wednesday" }}
 
 Now extract from:
 User: "{user_prompt}"
@@ -39,32 +111,33 @@ User: "{user_prompt}"
         "Content-Type": "application/json"
     }
 
-    for attempt in range(3):
-        try:
-            response = requests.post("https://api.together.xyz/v1/chat/completions", 
-                                  headers=headers, json=payload)
-            
-            if response.status_code == 429:
-                if attempt < 2:
-                    time.sleep(2 ** attempt)
-                    continue
-                print("❌ Rate limit exceeded.")
-                return None
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"]
-            else:
-                print("❌ Unexpected response format.")
-                return None
-                
-        except Exception as e:
-            if attempt < 2:
-                time.sleep(1)
-                continue
-            print(f"❌ API call failed: {e}")
+    try:
+        response = await resilience.call(
+            CHAT_COMPLETIONS_URL,
+            lambda: together_scheduler.scheduled(
+                lambda: http_client.post(CHAT_COMPLETIONS_URL, headers=headers, json=payload), payload
+            )
+        )
+        
+        if response.status_code == 429:
+            raise together_scheduler.RateLimited("Rate limit exceeded.")
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"]
+        else:
+            print("❌ Unexpected response format.", file=sys.stderr)
             return None
-    
-    return None
+            
+    except together_scheduler.RateLimited:
+        # Not a failed extraction: the caller reports it and the next try may succeed
+        print("❌ Rate limit exceeded.", file=sys.stderr)
+        raise
+    except Exception as e:
+        print(f"❌ API call failed: {e}", file=sys.stderr)
+        return None
+
+def extract_location_date(user_prompt):
+    return http_client.run_sync(extract_location_date_async(user_prompt))
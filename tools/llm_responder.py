@@ -1,14 +1,33 @@
 import os
-import requests
-import time
+import sys
+import json
 from dotenv import load_dotenv
+from tools import http_client, resilience, together_scheduler
 
 load_dotenv()
 
-def generate_weather_response(user_input, location, date, description, temperature):
+CHAT_COMPLETIONS_URL = os.getenv("TOGETHER_BASE_URL", "https://api.together.xyz").rstrip("/") + "/v1/chat/completions"
+
+async def read_stream(response, on_token, parts):
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        choices = json.loads(data).get("choices") or []
+        if not choices:
+            continue
+        delta = (choices[0].get("delta") or {}).get("content")
+        if delta:
+            parts.append(delta)
+            await on_token(delta)
+    return "".join(parts)
+
+async def generate_weather_response_async(user_input, location, date, description, temperature, on_token=None):
     api_key = os.getenv("TOGETHER_API_KEY")
     if not api_key:
-        print("❌ TOGETHER_API_KEY not found.")
+        print("❌ TOGETHER_API_KEY not found.", file=sys.stderr)
         return "❌ Error: API key not configured."
 
     prompt = f"""
@@ -23,11 +42,36 @@ Real-time weather data:
 
 Now write a friendly and helpful response to the user in natural language.
 """
+    return await request_response(api_key, prompt, 150, on_token)
+
+async def generate_range_response_async(user_input, location, date, forecast, on_token=None):
+    api_key = os.getenv("TOGETHER_API_KEY")
+    if not api_key:
+        print("❌ TOGETHER_API_KEY not found.", file=sys.stderr)
+        return "❌ Error: API key not configured."
+
+    days = "\n".join(
+        f"- {day['date']}: {day['description']}, {day['temp_min']}°C to {day['temp_max']}°C, "
+        f"{round(day['precipitation_probability'] * 100)}% chance of rain"
+        for day in forecast["days"]
+    )
+    prompt = f"""
+You are a helpful weather assistant.
+
+The user asked: "{user_input}"
+Real-time weather data for {location}, {date} ({forecast['start']} to {forecast['end']}):
+{days}
 
+Now write one friendly and helpful response covering the whole period in natural language.
+"""
+    # Room for a sentence or two per day
+    return await request_response(api_key, prompt, 100 + 40 * len(forecast["days"]), on_token)
+
+async def request_response(api_key, prompt, max_tokens, on_token=None):
     payload = {
         "model": "meta-llama/Llama-3-8b-chat-hf",
         "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 150,
+        "max_tokens": max_tokens,
         "temperature": 0.6
     }
 
@@ -36,30 +80,66 @@ Now write a friendly and helpful response to the user in natural language.
         "Content-Type": "application/json"
     }
 
-    for attempt in range(3):
-        try:
-            response = requests.post("https://api.together.xyz/v1/chat/completions", 
-                                  headers=headers, json=payload)
-            
-            if response.status_code == 429:
-                if attempt < 2:
-                    time.sleep(2 ** attempt)
-                    continue
-                return "❌ Rate limit exceeded."
+    if on_token:
+        return await stream_weather_response(headers, payload, on_token)
+
+    try:
+        response = await resilience.call(
+            CHAT_COMPLETIONS_URL,
+            lambda: together_scheduler.scheduled(
+                lambda: http_client.post(CHAT_COMPLETIONS_URL, headers=headers, json=payload), payload
+            )
+        )
+        
+        if response.status_code == 429:
+            return "❌ Rate limit exceeded."
+        
+        response.raise_for_status()
+        result = response.json()
+        
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"].strip()
+        else:
+            return "❌ Error: Unexpected response format."
             
+    except together_scheduler.QueueFull:
+        return "❌ Rate limit exceeded."
+    except Exception as e:
+        print(f"❌ API call failed: {e}", file=sys.stderr)
+        return "❌ Error: Could not generate response."
+
+async def stream_weather_response(headers, payload, on_token):
+    payload = {**payload, "stream": True}
+    parts = []
+
+    async def send():
+        async with http_client.stream("POST", CHAT_COMPLETIONS_URL,
+                                      headers=headers, json=payload) as response:
+            if response.status_code in resilience.RETRYABLE_STATUSES:
+                await response.aread()
+                raise resilience.RetryableStatus(response)
             response.raise_for_status()
-            result = response.json()
-            
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"].strip()
-            else:
-                return "❌ Error: Unexpected response format."
-                
-        except Exception as e:
-            if attempt < 2:
-                time.sleep(1)
-                continue
-            print(f"❌ API call failed: {e}")
-            return "❌ Error: Could not generate response."
-    
-    return "❌ Error: Could not generate response."
+            return await read_stream(response, on_token, parts)
+
+    try:
+        # Tokens already forwarded to the client cannot be taken back
+        text = await resilience.call(
+            CHAT_COMPLETIONS_URL, lambda: together_scheduler.scheduled(send, payload), can_retry=lambda: not parts
+        )
+        return text.strip() or "❌ Error: Unexpected response format."
+    except together_scheduler.QueueFull:
+        return "❌ Rate limit exceeded."
+    except resilience.RetryableStatus as e:
+        if e.response.status_code == 429:
+            return "❌ Rate limit exceeded."
+        print(f"❌ API call failed: {e}", file=sys.stderr)
+        return "❌ Error: Could not generate response."
+    except Exception as e:
+        print(f"❌ API call failed: {e}", file=sys.stderr)
+        return "❌ Error: Could not generate response."
+
+def generate_weather_response(user_input, location, date, description, temperature):
+    return http_client.run_sync(generate_weather_response_async(user_input, location, date, description, temperature))
+
+def generate_range_response(user_input, location, date, forecast):
+    return http_client.run_sync(generate_range_response_async(user_input, location, date, forecast))
@@ -0,0 +1,93 @@
+import time
+from bisect import bisect_left
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+class Histogram:
+    __slots__ = ("counts", "sum_ms", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.sum_ms = 0.0
+        self.count = 0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.sum_ms += ms
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "buckets": {("+Inf" if bound == float("inf") else str(bound)): n
+                        for bound, n in zip(BUCKETS_MS, self.counts)}
+        }
+
+histograms = {}
+counters = {}
+gauges = {}
+
+def histogram(name):
+    h = histograms.get(name)
+    if h is None:
+        h = histograms[name] = Histogram()
+    return h
+
+def incr(name, n=1):
+    counters[name] = counters.get(name, 0) + n
+
+class Span:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        gauges[self.name] = gauges.get(self.name, 0) + 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        histogram(self.name).observe((time.perf_counter() - self.started) * 1000)
+        gauges[self.name] -= 1
+        incr(self.name + ".calls")
+        if exc_type is not None:
+            incr(self.name + ".errors")
+        return False
+
+def span(name):
+    return Span(name)
+
+def snapshot():
+    return {
+        "histograms": {name: h.to_dict() for name, h in histograms.items()},
+        "counters": dict(counters),
+        "in_flight": dict(gauges)
+    }
+
+def metric_name(name):
+    return "weather_mcp_" + "".join(c if c.isalnum() else "_" for c in name)
+
+def prometheus(extra_counters=None):
+    lines = []
+    for name, h in sorted(histograms.items()):
+        metric = metric_name(name) + "_ms"
+        lines.append(f"# TYPE {metric} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS_MS, h.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else str(bound)
+            lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+        lines.append(f"{metric}_sum {h.sum_ms:.3f}")
+        lines.append(f"{metric}_count {h.count}")
+    for name, value in sorted({**counters, **(extra_counters or {})}.items()):
+        metric = metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, value in sorted(gauges.items()):
+        metric = metric_name(name) + "_in_flight"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
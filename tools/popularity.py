@@ -0,0 +1,40 @@
+import os
+import time
+import heapq
+
+POPULARITY_HALF_LIFE = float(os.getenv("POPULARITY_HALF_LIFE", "3600"))
+POPULARITY_MAX_KEYS = int(os.getenv("POPULARITY_MAX_KEYS", "10000"))
+
+# Exponentially decaying hit counts: a query counts 1 now and half that after one half-life
+class DecayingCounter:
+    def __init__(self, half_life=POPULARITY_HALF_LIFE, max_keys=POPULARITY_MAX_KEYS):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.entries = {}  # key -> [score, updated_at, label]
+
+    def decayed(self, entry, now):
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.half_life)
+
+    def record(self, key, label, now=None):
+        now = time.monotonic() if now is None else now
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [1.0, now, label]
+            if len(self.entries) > self.max_keys:
+                self.prune(now)
+        else:
+            entry[0] = self.decayed(entry, now) + 1
+            entry[1] = now
+            entry[2] = label
+
+    def prune(self, now):
+        # Drop the colder half rather than one key at a time
+        keep = self.top(self.max_keys // 2, now=now)
+        self.entries = {key: [score, now, label] for key, label, score in keep}
+
+    def top(self, k, min_score=0.0, now=None):
+        now = time.monotonic() if now is None else now
+        scored = ((key, entry[2], self.decayed(entry, now)) for key, entry in self.entries.items())
+        return [item for item in heapq.nlargest(k, scored, key=lambda item: item[2]) if item[2] >= min_score]
+
+city_popularity = DecayingCounter()
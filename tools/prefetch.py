@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import httpx
+from tools import metrics, resilience, weather
+from tools.popularity import city_popularity
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "20"))
+PREFETCH_MIN_SCORE = float(os.getenv("PREFETCH_MIN_SCORE", "2"))
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "60"))
+# Must stay under FORECAST_CACHE_GRACE so the refresh lands after OpenWeather's 3-hourly update
+PREFETCH_LEAD_TIME = float(os.getenv("PREFETCH_LEAD_TIME", "300"))
+PREFETCH_MAX_PER_MINUTE = float(os.getenv("PREFETCH_MAX_PER_MINUTE", "10"))
+
+# Keeps the most-asked cities warm: every round, popular cities whose cached forecast is
+# missing or about to expire are refreshed, within a token-bucket request budget
+class PrefetchScheduler:
+    def __init__(self, top_k=PREFETCH_TOP_K, min_score=PREFETCH_MIN_SCORE, interval=PREFETCH_INTERVAL,
+                 lead_time=PREFETCH_LEAD_TIME, max_per_minute=PREFETCH_MAX_PER_MINUTE):
+        self.top_k = top_k
+        self.min_score = min_score
+        self.interval = interval
+        self.lead_time = lead_time
+        self.max_per_minute = max_per_minute
+        self.tokens = max_per_minute
+        self.refilled_at = time.monotonic()
+        self.host = httpx.URL(weather.FORECAST_URL).netloc.decode()
+        self.task = None
+        self.stats = {"rounds": 0, "refreshed": 0, "failed": 0, "over_budget": 0, "paused": 0}
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval * random.uniform(0.8, 1.2))
+            try:
+                await self.run_round()
+            except Exception as e:
+                print(f"⚠️ Prefetch round failed: {e}", file=sys.stderr)
+
+    def take_token(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_per_minute, self.tokens + (now - self.refilled_at) * self.max_per_minute / 60)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def upstream_healthy(self):
+        breaker = resilience.breakers.get(self.host)
+        return breaker is None or breaker.state == "closed"
+
+    def due(self):
+        due = []
+        for key, location, _ in city_popularity.top(self.top_k, self.min_score):
+            remaining = weather.forecast_cache.expires_in(key)
+            if remaining is None or remaining < self.lead_time:
+                due.append(location)
+        return due
+
+    async def run_round(self):
+        self.stats["rounds"] += 1
+        due = self.due()
+        for i, location in enumerate(due):
+            # Leave a struggling upstream alone; user traffic will probe it through the breaker
+            if not self.upstream_healthy():
+                self.stats["paused"] += 1
+                return
+            if not self.take_token():
+                self.stats["over_budget"] += len(due) - i
+                return
+            with metrics.span("prefetch.refresh"):
+                index = await weather.refresh_forecast(location)
+            if index is None:
+                # One bad city must not starve the ones ranked below it; a failing
+                # upstream as a whole is caught by the breaker check above
+                self.stats["failed"] += 1
+                continue
+            self.stats["refreshed"] += 1
+            # Spread the round's refreshes instead of bursting them
+            await asyncio.sleep(random.uniform(0, self.interval / (2 * len(due))))
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "tokens": round(self.tokens, 2),
+            "hot": [{"location": location, "score": round(score, 2)}
+                    for _, location, score in city_popularity.top(self.top_k, self.min_score)]
+        }
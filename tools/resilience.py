@@ -0,0 +1,183 @@
+import os
+import time
+import random
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+import httpx
+from tools import metrics
+
+MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+MAX_RETRY_AFTER = float(os.getenv("UPSTREAM_MAX_RETRY_AFTER", "30"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class UpstreamError(Exception):
+    pass
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+class DeadlineExceeded(UpstreamError):
+    pass
+
+class RetryableStatus(UpstreamError):
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+# Absolute time.monotonic() deadline for the current request, inherited by child tasks
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline(seconds):
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining():
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+class CircuitBreaker:
+    def __init__(self, host, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.rejected = 0
+
+    def allow(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            # Exactly one trial request probes a recovering upstream
+            if self.trial_in_flight:
+                self.rejected += 1
+                return False
+            self.trial_in_flight = True
+        return True
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                metrics.incr(f"breaker.{self.host}.opened")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # An attempt that ended without a verdict (e.g. 429) must not pin the trial slot
+        self.trial_in_flight = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+            "retry_in": round(max(self.reset_timeout - (time.monotonic() - self.opened_at), 0), 1)
+            if self.state == "open" else 0
+        }
+
+breakers = {}
+
+def breaker(host):
+    b = breakers.get(host)
+    if b is None:
+        b = breakers[host] = CircuitBreaker(host)
+    return b
+
+def get_breaker_stats():
+    return {host: b.stats() for host, b in breakers.items()}
+
+def retry_after(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return min(float(value), MAX_RETRY_AFTER)
+    except ValueError:
+        pass
+    try:
+        return min(max(parsedate_to_datetime(value).timestamp() - time.time(), 0), MAX_RETRY_AFTER)
+    except (TypeError, ValueError):
+        return None
+
+def backoff(attempt):
+    # Full jitter keeps rate-limited callers from retrying in lockstep
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+# Runs send() under the host's circuit breaker and the request deadline. send may return
+# an httpx.Response (429/5xx are retried) or any other result, or raise RetryableStatus.
+# A 429/5xx response that survives every attempt is returned to the caller as-is.
+async def call(url, send, max_attempts=MAX_ATTEMPTS, can_retry=None):
+    host = httpx.URL(url).netloc.decode()
+    b = breaker(host)
+    for attempt in range(max_attempts):
+        if not b.allow():
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        budget = remaining()
+        if budget is not None and budget <= 0:
+            b.release()
+            raise DeadlineExceeded(f"Deadline exceeded calling {host}")
+
+        response = None
+        try:
+            result = await asyncio.wait_for(send(), budget)
+            if not isinstance(result, httpx.Response) or result.status_code not in RETRYABLE_STATUSES:
+                b.success()
+                return result
+            response, error = result, RetryableStatus(result)
+        except RetryableStatus as e:
+            response, error = e.response, e
+        except (httpx.TransportError, asyncio.TimeoutError) as e:
+            error = e
+        except BaseException:
+            b.release()
+            raise
+
+        if response is not None and response.status_code == 429:
+            b.release()
+        else:
+            b.failure()
+
+        last_attempt = attempt == max_attempts - 1 or (can_retry is not None and not can_retry())
+        delay = retry_after(response) if response is not None else None
+        delay = backoff(attempt) if delay is None else delay
+        budget = remaining()
+        if not last_attempt and budget is not None and delay >= budget:
+            last_attempt = True
+        if last_attempt:
+            if response is not None:
+                return response
+            if isinstance(error, asyncio.TimeoutError):
+                raise DeadlineExceeded(f"Deadline exceeded calling {host}")
+            raise error
+
+        metrics.incr("upstream.retries")
+        await asyncio.sleep(delay)
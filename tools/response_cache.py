@@ -0,0 +1,127 @@
+import os
+import random
+from dotenv import load_dotenv
+from tools.cache import TTLCache
+from tools.llm_extractor import normalize_prompt
+
+load_dotenv()
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "0") == "1"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(3 * 60 * 60)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "4096"))
+RESPONSE_CACHE_VARIANTS = int(os.getenv("RESPONSE_CACHE_VARIANTS", "3"))
+# Chance that a lookup on a not-yet-full pool asks the LLM for another wording
+RESPONSE_CACHE_EXPLORE = float(os.getenv("RESPONSE_CACHE_EXPLORE", "0.2"))
+RESPONSE_CACHE_TEMP_STEP = float(os.getenv("RESPONSE_CACHE_TEMP_STEP", "1"))
+
+# First match wins; anything else is a general "what's the weather" question
+INTENTS = [
+    ("rain", {"rain", "raining", "rainy", "umbrella", "wet", "shower", "showers", "storm", "drizzle", "snow"}),
+    ("clothing", {"wear", "jacket", "coat", "dress", "shorts", "sweater"}),
+    ("activity", {"outside", "outdoor", "picnic", "walk", "run", "beach", "hike", "travel", "trip", "go"}),
+    ("temperature", {"hot", "cold", "warm", "cool", "temperature", "degrees", "freezing", "chilly"}),
+]
+
+def intent_of(user_input):
+    words = set(normalize_prompt(user_input).split())
+    for name, keywords in INTENTS:
+        if words & keywords:
+            return name
+    return "general"
+
+def bucket(value, step=RESPONSE_CACHE_TEMP_STEP):
+    return round(value / step) if value is not None else None
+
+# What the generated text was based on; any change means the forecast moved and
+# the cached wordings no longer describe it
+def signature(weather):
+    if "days" in weather:
+        return tuple(
+            (day["description"].lower(), bucket(day["temp_min"]), bucket(day["temp_max"]),
+             round(day["precipitation_probability"] * 10))
+            for day in weather["days"]
+        )
+    return (str(weather.get("description", "")).lower(), bucket(weather.get("temperature")))
+
+class VariantPool:
+    __slots__ = ("signature", "variants", "turn")
+
+    def __init__(self, signature):
+        self.signature = signature
+        self.variants = []
+        self.turn = 0
+
+    def next(self):
+        # Rotate so back-to-back askers get different wordings
+        text = self.variants[self.turn % len(self.variants)]
+        self.turn += 1
+        return text
+
+# Generated answers keyed on (city, date, intent), each holding a few wordings
+# for one forecast signature
+class ResponseCache:
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl=RESPONSE_CACHE_TTL,
+                 variants=RESPONSE_CACHE_VARIANTS, explore=RESPONSE_CACHE_EXPLORE):
+        self.entries = TTLCache(max_entries=max_entries)
+        self.ttl = ttl
+        self.variants = variants
+        self.explore = explore
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "invalidated": 0}
+
+    def current(self, key, signature):
+        pool = self.entries.get(key)
+        if pool is not None and pool.signature != signature:
+            self.entries.invalidate(key)
+            self.stats["invalidated"] += 1
+            return None
+        return pool
+
+    def pick(self, key, signature):
+        pool = self.current(key, signature)
+        if pool is None or (len(pool.variants) < self.variants and random.random() < self.explore):
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return pool.next()
+
+    def add(self, key, signature, text):
+        pool = self.current(key, signature)
+        if pool is None:
+            pool = VariantPool(signature)
+            self.entries.set(key, pool, self.ttl)
+        if text not in pool.variants and len(pool.variants) < self.variants:
+            pool.variants.append(text)
+            self.stats["stored"] += 1
+
+    def get_stats(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        entries = self.entries.stats()
+        return {
+            **self.stats,
+            "entries": entries["entries"],
+            "evictions": entries["evictions"],
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+response_cache = ResponseCache()
+
+# place is (city key, resolved date or span); generate() makes a fresh LLM answer
+async def memoized(place, user_input, weather, generate, on_token=None):
+    if not RESPONSE_CACHE_ENABLED or place is None:
+        return await generate()
+
+    key = (*place, intent_of(user_input))
+    current = signature(weather)
+    text = response_cache.pick(key, current)
+    if text is not None:
+        if on_token:
+            await on_token(text)
+        return text
+
+    text = await generate()
+    if not text.startswith("❌"):
+        response_cache.add(key, current, text)
+    return text
+
+def get_response_cache_stats():
+    return response_cache.get_stats()
@@ -0,0 +1,80 @@
+import asyncio
+
+class Listener:
+    __slots__ = ("on_token", "sent", "shown", "lock")
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self.sent = 0
+        self.shown = False
+        self.lock = asyncio.Lock()
+
+class Flight:
+    __slots__ = ("task", "tokens", "listeners")
+
+    def __init__(self):
+        self.task = None
+        self.tokens = []
+        self.listeners = []
+
+    # Tokens are kept whether or not anyone listens yet, so a streaming caller that joins a
+    # non-streaming leader still gets all of them. Returns False until some caller has shown
+    # one; an on_token that returns False passes tokens on without showing them.
+    async def emit(self, text):
+        self.tokens.append(text)
+        for listener in list(self.listeners):
+            await self.deliver(listener)
+        return any(listener.shown for listener in self.listeners)
+
+    async def deliver(self, listener):
+        # Late joiners first catch up on what was already streamed, in order
+        async with listener.lock:
+            while listener.sent < len(self.tokens):
+                text = self.tokens[listener.sent]
+                listener.sent += 1
+                try:
+                    if await listener.on_token(text) is not False:
+                        listener.shown = True
+                except Exception:
+                    # One caller's broken stream must not fail the shared work
+                    if listener in self.listeners:
+                        self.listeners.remove(listener)
+                    return
+
+# Concurrent run() calls with the same key share one execution of work(emit). Every caller
+# gets the same result or exception; a cancelled caller leaves the others untouched.
+class SingleFlight:
+    def __init__(self):
+        self.flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key, work, on_token=None):
+        flight = self.flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            flight = self.flights[key] = Flight()
+            flight.task = asyncio.ensure_future(work(flight.emit))
+            flight.task.add_done_callback(lambda _: self.flights.pop(key, None))
+        else:
+            self.coalesced += 1
+
+        listener = None
+        if on_token is not None:
+            listener = Listener(on_token)
+            flight.listeners.append(listener)
+            await flight.deliver(listener)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            if listener in flight.listeners:
+                flight.listeners.remove(listener)
+
+    def stats(self):
+        calls = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.flights),
+            "coalesce_ratio": round(self.coalesced / calls, 4) if calls else 0.0
+        }
@@ -0,0 +1,145 @@
+import random
+import datetime
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+TEMPLATES = {
+    "en": {
+        "today": "today",
+        "tomorrow": "tomorrow",
+        "on_day": "on {day}",
+        "weekdays": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
+        "phrases": [
+            "{When_cap} in {location}, expect {description} with an average of {temperature}°C (between {temp_min}°C and {temp_max}°C).",
+            "The forecast for {location} {when}: {description}, around {temperature}°C, ranging from {temp_min}°C to {temp_max}°C.",
+            "{location} {when} looks like {description}. Temperatures should sit around {temperature}°C, from {temp_min}°C up to {temp_max}°C.",
+        ],
+        "range": "{location} from {start} to {end}: mostly {description}, between {temp_min}°C and {temp_max}°C.",
+        "day": "{day}: {description}, {temp_min}–{temp_max}°C",
+        "day_rain": "{day}: {description}, {temp_min}–{temp_max}°C, {pop}% chance of rain",
+        "rain": "There's a {pop}% chance of rain, so keep an umbrella handy.",
+        "hot": "It will be hot, so stay hydrated.",
+        "cold": "It will be cold, so dress warmly.",
+    },
+    "es": {
+        "today": "hoy",
+        "tomorrow": "mañana",
+        "on_day": "el {day}",
+        "weekdays": ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"],
+        "phrases": [
+            "{When_cap} en {location} se espera {description}, con una media de {temperature}°C (entre {temp_min}°C y {temp_max}°C).",
+            "Pronóstico para {location} {when}: {description}, unos {temperature}°C, de {temp_min}°C a {temp_max}°C.",
+        ],
+        "range": "{location} del {start} al {end}: mayormente {description}, entre {temp_min}°C y {temp_max}°C.",
+        "day": "{day}: {description}, {temp_min}–{temp_max}°C",
+        "day_rain": "{day}: {description}, {temp_min}–{temp_max}°C, {pop}% de probabilidad de lluvia",
+        "rain": "Hay un {pop}% de probabilidad de lluvia, lleva paraguas.",
+        "hot": "Hará calor, mantente hidratado.",
+        "cold": "Hará frío, abrígate bien.",
+    },
+    "fr": {
+        "today": "aujourd'hui",
+        "tomorrow": "demain",
+        "on_day": "{day}",
+        "weekdays": ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"],
+        "phrases": [
+            "{When_cap} à {location}, prévoyez {description} avec une moyenne de {temperature}°C (entre {temp_min}°C et {temp_max}°C).",
+            "Prévisions pour {location} {when} : {description}, environ {temperature}°C, de {temp_min}°C à {temp_max}°C.",
+        ],
+        "range": "{location} du {start} au {end} : surtout {description}, entre {temp_min}°C et {temp_max}°C.",
+        "day": "{day} : {description}, {temp_min}–{temp_max}°C",
+        "day_rain": "{day} : {description}, {temp_min}–{temp_max}°C, {pop}% de risque de pluie",
+        "rain": "Il y a {pop}% de risque de pluie, pensez au parapluie.",
+        "hot": "Il fera chaud, pensez à bien vous hydrater.",
+        "cold": "Il fera froid, couvrez-vous bien.",
+    },
+    "de": {
+        "today": "heute",
+        "tomorrow": "morgen",
+        "on_day": "am {day}",
+        "weekdays": ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"],
+        "phrases": [
+            "{When_cap} in {location}: {description} bei durchschnittlich {temperature}°C (zwischen {temp_min}°C und {temp_max}°C).",
+            "Die Vorhersage für {location} {when}: {description}, etwa {temperature}°C, von {temp_min}°C bis {temp_max}°C.",
+        ],
+        "range": "{location} von {start} bis {end}: überwiegend {description}, zwischen {temp_min}°C und {temp_max}°C.",
+        "day": "{day}: {description}, {temp_min}–{temp_max}°C",
+        "day_rain": "{day}: {description}, {temp_min}–{temp_max}°C, {pop}% Regenwahrscheinlichkeit",
+        "rain": "Die Regenwahrscheinlichkeit liegt bei {pop}%, nimm einen Schirm mit.",
+        "hot": "Es wird heiß, trink genug.",
+        "cold": "Es wird kalt, zieh dich warm an.",
+    },
+}
+
+def describe_date(date_text, strings):
+    key = date_text.strip().lower()
+    if key in ("today", "tomorrow"):
+        return strings[key]
+    if key in WEEKDAYS:
+        return strings["on_day"].format(day=strings["weekdays"][WEEKDAYS.index(key)])
+    try:
+        day = datetime.date.fromisoformat(key)
+    except ValueError:
+        return strings["on_day"].format(day=date_text)
+    return strings["on_day"].format(day=f"{strings['weekdays'][day.weekday()]} {day.isoformat()}")
+
+def format_temperature(value):
+    return f"{value:.0f}" if value is not None else "?"
+
+def render_weather_response(location, date, weather, language="en"):
+    strings = TEMPLATES.get(language, TEMPLATES["en"])
+    when = describe_date(date, strings)
+    temperature = weather.get("temperature")
+    temp_min = weather.get("temp_min", temperature)
+    temp_max = weather.get("temp_max", temperature)
+
+    sentences = [random.choice(strings["phrases"]).format(
+        location=location,
+        when=when,
+        When_cap=when[:1].upper() + when[1:],
+        description=str(weather.get("description", "")).lower(),
+        temperature=format_temperature(temperature),
+        temp_min=format_temperature(temp_min),
+        temp_max=format_temperature(temp_max)
+    )]
+
+    pop = weather.get("precipitation_probability") or 0
+    if pop >= 0.4:
+        sentences.append(strings["rain"].format(pop=round(pop * 100)))
+    if temp_max is not None and temp_max >= 35:
+        sentences.append(strings["hot"])
+    elif temp_min is not None and temp_min <= 5:
+        sentences.append(strings["cold"])
+    return " ".join(sentences)
+
+def weekday_name(date_text, strings):
+    return strings["weekdays"][datetime.date.fromisoformat(date_text).weekday()]
+
+# One answer for a whole span: a summary sentence, then one short line per day
+def render_range_response(location, forecast, language="en"):
+    if len(forecast["days"]) == 1:
+        return render_weather_response(location, forecast["start"], forecast["days"][0], language)
+    strings = TEMPLATES.get(language, TEMPLATES["en"])
+    sentences = [strings["range"].format(
+        location=location,
+        start=weekday_name(forecast["start"], strings),
+        end=weekday_name(forecast["end"], strings),
+        description=str(forecast.get("description", "")).lower(),
+        temp_min=format_temperature(forecast.get("temp_min")),
+        temp_max=format_temperature(forecast.get("temp_max"))
+    )]
+
+    for day in forecast["days"]:
+        pop = day.get("precipitation_probability") or 0
+        sentences.append(strings["day_rain" if pop >= 0.4 else "day"].format(
+            day=weekday_name(day["date"], strings),
+            description=str(day.get("description", "")).lower(),
+            temp_min=format_temperature(day.get("temp_min")),
+            temp_max=format_temperature(day.get("temp_max")),
+            pop=round(pop * 100)
+        ) + ".")
+    if (forecast.get("temp_max") or 0) >= 35:
+        sentences.append(strings["hot"])
+    elif forecast.get("temp_min") is not None and forecast["temp_min"] <= 5:
+        sentences.append(strings["cold"])
+    return " ".join(sentences)
@@ -0,0 +1,166 @@
+import os
+import time
+import heapq
+import asyncio
+import contextvars
+import httpx
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from tools import metrics, resilience
+
+load_dotenv()
+
+# 0 turns the client-side limits off and leaves only the server's 429s
+MAX_RPS = float(os.getenv("TOGETHER_MAX_RPS", "5"))
+MAX_TOKENS_PER_MINUTE = float(os.getenv("TOGETHER_MAX_TOKENS_PER_MINUTE", "60000"))
+QUEUE_LIMIT = int(os.getenv("TOGETHER_QUEUE_LIMIT", "64"))
+
+# Lower value is served first; batch may only fill half the queue, so it is shed first
+PRIORITIES = {"interactive": 0, "batch": 1}
+QUEUE_SHARE = {"interactive": 1.0, "batch": 0.5}
+
+CHARS_PER_TOKEN = 4
+
+# The Together budget is spent, whether the API said so (429) or our own queue did
+class RateLimited(resilience.UpstreamError):
+    pass
+
+class QueueFull(RateLimited):
+    pass
+
+_priority = contextvars.ContextVar("together_priority", default="interactive")
+
+@contextmanager
+def priority(name):
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def estimate_tokens(payload):
+    prompt = sum(len(message.get("content", "")) for message in payload.get("messages", []))
+    return prompt // CHARS_PER_TOKEN + payload.get("max_tokens", 0)
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, amount, now):
+        self.refill(now)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+# Client-side admission for every Together call: requests/second and tokens/minute
+# budgets, a bounded priority queue, and a global pause after the API answers 429
+class TogetherScheduler:
+    def __init__(self, max_rps=MAX_RPS, max_tokens_per_minute=MAX_TOKENS_PER_MINUTE, queue_limit=QUEUE_LIMIT):
+        self.requests = TokenBucket(max(max_rps, 1), max_rps)
+        self.tokens = TokenBucket(max_tokens_per_minute, max_tokens_per_minute / 60)
+        self.queue_limit = queue_limit
+        self.queue = []  # (priority, seq, cost, future)
+        self.seq = 0
+        self.paused_until = 0.0
+        self.pump_task = None
+        self.stats = {"admitted": 0, "shed": 0, "throttled": 0}
+
+    async def acquire(self, cost, name=None):
+        name = name or _priority.get()
+        cost = min(cost, self.tokens.capacity)
+        now = time.monotonic()
+        if not self.queue and now >= self.paused_until and self.ready(cost, now) == 0:
+            self.admit(cost)
+            return
+
+        if len(self.queue) >= self.queue_limit * QUEUE_SHARE[name]:
+            self.stats["shed"] += 1
+            metrics.incr(f"together.shed.{name}")
+            raise QueueFull(f"Together queue full ({len(self.queue)} waiting); try again shortly")
+
+        future = asyncio.get_running_loop().create_future()
+        self.seq += 1
+        heapq.heappush(self.queue, (PRIORITIES[name], self.seq, cost, future))
+        if self.pump_task is None or self.pump_task.done() or self.pump_task.get_loop() is not future.get_loop():
+            self.pump_task = asyncio.ensure_future(self.pump())
+
+        with metrics.span(f"together.queue_wait.{name}"):
+            try:
+                await asyncio.wait_for(future, resilience.remaining())
+            except asyncio.TimeoutError:
+                raise resilience.DeadlineExceeded("Deadline exceeded waiting for Together quota")
+
+    def ready(self, cost, now):
+        return max(self.requests.wait(1, now), self.tokens.wait(cost, now))
+
+    def admit(self, cost):
+        self.requests.take(1)
+        self.tokens.take(cost)
+        self.stats["admitted"] += 1
+
+    async def pump(self):
+        while self.queue:
+            _, _, cost, future = self.queue[0]
+            if future.done():
+                # The waiter gave up (cancelled or past its deadline)
+                heapq.heappop(self.queue)
+                continue
+            now = time.monotonic()
+            wait = max(self.paused_until - now, self.ready(cost, now))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self.queue)
+            self.admit(cost)
+            future.set_result(None)
+
+    def throttle(self, seconds):
+        # A 429 means the server-side budget is spent; hold everyone back, not just the caller
+        self.stats["throttled"] += 1
+        self.paused_until = max(self.paused_until, time.monotonic() + (seconds or 1.0))
+
+    def get_stats(self):
+        now = time.monotonic()
+        waiting = {}
+        for level, _, _, future in self.queue:
+            if not future.done():
+                name = next(name for name, value in PRIORITIES.items() if value == level)
+                waiting[name] = waiting.get(name, 0) + 1
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return {
+            **self.stats,
+            "queued": waiting,
+            "paused_for": round(max(self.paused_until - now, 0), 2),
+            "request_tokens": round(self.requests.tokens, 2),
+            "llm_tokens": round(self.tokens.tokens)
+        }
+
+scheduler = TogetherScheduler()
+
+# Wraps one Together HTTP attempt: waits for quota, then reports 429s back to the scheduler
+async def scheduled(send, payload):
+    if MAX_RPS > 0:
+        await scheduler.acquire(estimate_tokens(payload))
+    try:
+        result = await send()
+    except resilience.RetryableStatus as e:
+        if e.response.status_code == 429:
+            scheduler.throttle(resilience.retry_after(e.response))
+        raise
+    if isinstance(result, httpx.Response) and result.status_code == 429:
+        scheduler.throttle(resilience.retry_after(result))
+    return result
+
+def get_scheduler_stats():
+    return scheduler.get_stats()
@@ -1,80 +1,255 @@
-import requests
+import asyncio
 import datetime
-import dateparser
 import os
+import sys
+import time
 from dotenv import load_dotenv
+from tools import http_client, json_codec, metrics, resilience, disk_cache
+from tools.cache import TTLCache
+from tools.forecast_index import build_forecast_index, summarize_days
+from tools.city_index import resolve_city
+from tools.date_resolver import resolve_date_async, resolve_range_async
+from tools.popularity import city_popularity
 
 load_dotenv()
 
-CITY_FIXES = {
-    "karchi": "Karachi", "lahor": "Lahore", "islamabd": "Islamabad",
-    "madina": "Medina", "makah": "Mecca", "makka": "Mecca", 
-    "makkah": "Mecca", "mecca": "Mecca"
-}
+FORECAST_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org").rstrip("/") + "/data/2.5/forecast"
 
-DAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-        'friday': 4, 'saturday': 5, 'sunday': 6}
+# OpenWeather refreshes the 5-day/3-hour forecast every three hours
+FORECAST_UPDATE_INTERVAL = 3 * 60 * 60
+FORECAST_CACHE_GRACE = int(os.getenv("FORECAST_CACHE_GRACE", "600"))
+FORECAST_DAYS = 5
 
-def get_next_weekday(day_name):
-    day_name = day_name.lower()
-    if day_name not in DAYS:
-        return None
-    
-    target_day = DAYS[day_name]
-    today = datetime.date.today()
-    days_ahead = target_day - today.weekday()
-    
-    if days_ahead <= 0:
-        days_ahead += 7
-    
-    return today + datetime.timedelta(days=days_ahead)
+forecast_cache = TTLCache(
+    max_entries=int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("FORECAST_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    store=disk_cache.store,
+    namespace="forecast",
+    encode=lambda index: json_codec.dumps(index.to_payload()),
+    decode=lambda data: build_forecast_index(json_codec.loads(data))
+)
 
-def get_weather_forecast(location, date_text):
-    location = location.strip().title()
-    location = CITY_FIXES.get(location.lower(), location)
+def forecast_query(location):
+    # Known cities are fetched by coordinates and cached under their canonical ID,
+    # so typos and aliases share one entry; anything else goes upstream by name
+    city = resolve_city(location)
+    if city is None:
+        name = " ".join(location.split()).title()
+        return name.lower(), {"q": name}
+    return city.id, {"lat": city.lat, "lon": city.lon}
 
-    day_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-    
-    if date_text.lower() in day_names:
-        target_date = get_next_weekday(date_text)
-    else:
-        parsed_date = dateparser.parse(date_text)
-        if not parsed_date:
-            print("❌ Couldn't parse date.")
-            return None
-        target_date = parsed_date.date()
-
-    today = datetime.date.today()
-    max_date = today + datetime.timedelta(days=4)
-    if target_date > max_date:
-        print(f"❌ Forecast only available for next 5 days (up to {max_date.strftime('%Y-%m-%d')})")
-        return None
+def forecast_ttl(now=None):
+    now = time.time() if now is None else now
+    next_update = (int(now) // FORECAST_UPDATE_INTERVAL + 1) * FORECAST_UPDATE_INTERVAL
+    return next_update + FORECAST_CACHE_GRACE - now
+
+def get_forecast_cache_stats():
+    return forecast_cache.stats()
 
+async def fetch_forecast(query):
     api_key = os.getenv("OPENWEATHER_API_KEY")
     if not api_key:
-        print("❌ OPENWEATHER_API_KEY not found.")
+        print("❌ OPENWEATHER_API_KEY not found.", file=sys.stderr)
         return None
 
-    url = f"http://api.openweathermap.org/data/2.5/forecast?q={location}&appid={api_key}&units=metric"
+    params = {**query, "appid": api_key, "units": "metric"}
     
     try:
-        response = requests.get(url)
+        response = await resilience.call(FORECAST_URL, lambda: http_client.get(FORECAST_URL, params=params))
         response.raise_for_status()
-        data = response.json()
+        return build_forecast_index(response.json())
     except:
-        print("❌ Error fetching weather data.")
+        print("❌ Error fetching weather data.", file=sys.stderr)
         return None
 
-    forecast_list = data.get("list", [])
-    for entry in forecast_list:
-        dt_txt = entry["dt_txt"]
-        entry_date = datetime.datetime.strptime(dt_txt, "%Y-%m-%d %H:%M:%S").date()
-        
-        if entry_date == target_date:
-            return {
-                "description": entry["weather"][0]["description"].capitalize(),
-                "temperature": entry["main"]["temp"]
-            }
-    
-    print("❌ Forecast not available for that date.")
-    return None
+async def get_forecast_index(location):
+    key, query = forecast_query(location)
+    index = await forecast_cache.get_or_fetch(
+        key,
+        lambda: fetch_forecast(query),
+        lambda _: forecast_ttl(),
+        sizeof=lambda index: index.size
+    )
+    # Names upstream cannot answer (typos, unknown places) never become prefetch candidates
+    if index is not None:
+        city_popularity.record(key, location)
+    return index
+
+async def refresh_forecast(location):
+    key, query = forecast_query(location)
+    return await forecast_cache.refresh(
+        key,
+        lambda: fetch_forecast(query),
+        lambda _: forecast_ttl(),
+        sizeof=lambda index: index.size
+    )
+
+async def resolve_target_date(date_text, today=None):
+    with metrics.span("stage.date_parse"):
+        return await parse_target_date(date_text, today)
+
+def forecast_horizon(today=None):
+    return (today or datetime.date.today()) + datetime.timedelta(days=FORECAST_DAYS - 1)
+
+def horizon_error(max_date):
+    return f"Forecast only available for next {FORECAST_DAYS} days (up to {max_date.strftime('%Y-%m-%d')})"
+
+async def parse_target_date(date_text, today=None):
+    target_date = await resolve_date_async(date_text, today)
+    if not target_date:
+        return None, "Couldn't parse date."
+
+    max_date = forecast_horizon(today)
+    if target_date > max_date:
+        return None, horizon_error(max_date)
+    return target_date, None
+
+async def resolve_target_range(date_text, today=None):
+    with metrics.span("stage.date_parse"):
+        return await parse_target_range(date_text, today)
+
+# A span is clipped to what the forecast covers; a single date is a one-day span
+async def parse_target_range(date_text, today=None):
+    today = today or datetime.date.today()
+    span = await resolve_range_async(date_text, today)
+    if span is None:
+        target_date = await resolve_date_async(date_text, today)
+        if not target_date:
+            return None, "Couldn't parse date."
+        span = (target_date, target_date)
+
+    max_date = forecast_horizon(today)
+    start, end = max(span[0], today), min(span[1], max_date)
+    if start > max_date:
+        return None, horizon_error(max_date)
+    if start > end:
+        return None, "Forecast not available for past dates."
+    return (start, end, (start, end) != span), None
+
+def lookup_forecast(index, target_date, hour=None):
+    day = index.day(target_date)
+    if day is None:
+        return None
+
+    result = day.to_dict()
+    if hour is not None:
+        slot = day.slot_at(int(hour))
+        result.update(slot.to_dict())
+    return result
+
+def lookup_forecast_range(index, start, end, clipped=False, hourly=True):
+    days = index.span(start, end)
+    if not days:
+        return None
+
+    result = {"start": days[0].date.isoformat(), "end": days[-1].date.isoformat(), "clipped": clipped}
+    result.update(summarize_days(days))
+    result["days"] = []
+    for day in days:
+        entry = day.to_dict()
+        if hourly:
+            entry["hourly"] = [slot.to_dict() for slot in day.hourly()]
+        result["days"].append(entry)
+    return result
+
+async def check_date(date_text):
+    # Only whether the text is a date at all; its day is known once the city's timezone is
+    return None if await resolve_date_async(date_text) else "Couldn't parse date."
+
+async def get_weather_forecast_async(location, date_text, hour=None):
+    error = await check_date(date_text)
+    if error:
+        print(f"❌ {error}", file=sys.stderr)
+        return None
+
+    index = await get_forecast_index(location)
+    if not index:
+        return None
+
+    target_date, error = await resolve_target_date(date_text, index.local_today())
+    if error:
+        print(f"❌ {error}", file=sys.stderr)
+        return None
+
+    result = lookup_forecast(index, target_date, hour)
+    if result is None:
+        print("❌ Forecast not available for that date.", file=sys.stderr)
+    return result
+
+async def get_weather_forecasts_async(queries):
+    # Check every query first, then fetch each distinct city exactly once
+    items = []
+    cities = {}
+    for query in queries:
+        # A malformed item fails alone, like a failed fetch, never the whole batch
+        try:
+            key = forecast_query(query["location"])[0]
+            error = await check_date(query["date"])
+        except Exception as e:
+            key, error = None, f"Invalid query: {e!r}"
+        items.append((key, query, error))
+        if not error:
+            cities.setdefault(key, query["location"])
+
+    indexes = await asyncio.gather(*(get_forecast_index(location) for location in cities.values()))
+    indexes = dict(zip(cities, indexes))
+
+    results = []
+    for key, query, error in items:
+        if error:
+            results.append({"error": error})
+            continue
+        index = indexes[key]
+        if not index:
+            results.append({"error": "Could not fetch weather data"})
+            continue
+        try:
+            if query.get("span"):
+                target, error = await resolve_target_range(query["date"], index.local_today())
+            else:
+                target, error = await resolve_target_date(query["date"], index.local_today())
+            if error:
+                results.append({"error": error})
+                continue
+            if query.get("span"):
+                result = lookup_forecast_range(index, *target, hourly=query.get("hourly", True))
+            else:
+                result = lookup_forecast(index, target, query.get("hour"))
+        except Exception as e:
+            results.append({"error": f"Invalid query: {e!r}"})
+            continue
+        if result is None:
+            results.append({"error": "Forecast not available for that date."})
+        else:
+            results.append({"result": result})
+    return results
+
+async def get_weather_range_async(location, date_text, hourly=True):
+    error = await check_date(date_text)
+    if error:
+        print(f"❌ {error}", file=sys.stderr)
+        return None
+
+    # The whole span comes out of one cached 5-day payload
+    index = await get_forecast_index(location)
+    if not index:
+        return None
+
+    span, error = await resolve_target_range(date_text, index.local_today())
+    if error:
+        print(f"❌ {error}", file=sys.stderr)
+        return None
+
+    result = lookup_forecast_range(index, *span, hourly=hourly)
+    if result is None:
+        print("❌ Forecast not available for those dates.", file=sys.stderr)
+    return result
+
+def get_weather_forecast(location, date_text, hour=None):
+    return http_client.run_sync(get_weather_forecast_async(location, date_text, hour))
+
+def get_weather_forecasts(queries):
+    return http_client.run_sync(get_weather_forecasts_async(queries))
+
+def get_weather_range(location, date_text, hourly=True):
+    return http_client.run_sync(get_weather_range_async(location, date_text, hourly))